@@ -1,91 +1,49 @@
 import streamlit as st
-import PyPDF2
 import json
 import os
 from dotenv import load_dotenv
 import io
+import time
+from typing import Iterator
 from summarizer import TextSummarizer
-import docx
-import pptx
+from json_stream import iter_json_records, group_threads
+import metrics
+from extractors import extract_text, UnsupportedFormatError
+from uploads import SummaryArchive, summarize_files
+from cache import get_default_extraction_cache
+from resilience import ModelUnavailableError, SummarizationError
 load_dotenv()
 
-# Handle textract import gracefully
-try:
-    import textract
-    HAS_TEXTRACT = True
-except ImportError:
-    HAS_TEXTRACT = False
-
 def extract_text_from_file(uploaded_file) -> str:
     """Extract text from various file formats"""
-    text = ''
     try:
-        file_extension = uploaded_file.name.split('.')[-1].lower()
-        
-        if file_extension == "pdf":
-            pdf_reader = PyPDF2.PdfReader(uploaded_file)
-            for page_num in range(len(pdf_reader.pages)):
-                page_text = pdf_reader.pages[page_num].extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                    
-        elif file_extension == "docx":
-            doc = docx.Document(uploaded_file)
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text += paragraph.text + "\n"
-                    
-        elif file_extension == "txt":
-            text = uploaded_file.read().decode("utf-8")
-            
-        elif file_extension == "pptx":
-            ppt = pptx.Presentation(uploaded_file)
-            for slide in ppt.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        text += shape.text + "\n"
-        else:
-            # Fallback to textract for other formats
-            if HAS_TEXTRACT:
-                try:
-                    text = textract.process(uploaded_file).decode("utf-8")
-                except Exception:
-                    st.error(f"Error processing {file_extension.upper()} file with textract")
-                    return ""
-            else:
-                st.error(f"File format {file_extension.upper()} not supported. Please use PDF, DOCX, TXT, PPTX, or JSON files.")
-                return ""
-            
+        return extract_text(uploaded_file, uploaded_file.name)
+    except UnsupportedFormatError as e:
+        st.error(str(e))
+        return ""
     except Exception as e:
         st.error(f"Error extracting text from {uploaded_file.name}: {str(e)}")
         return ""
-    
-    return text.strip()
 
-def process_json_file(uploaded_file) -> list:
-    """Process uploaded JSON file and extract thread data"""
+def process_json_file(uploaded_file) -> Iterator[dict]:
+    """Stream email messages from an uploaded JSON array or JSON Lines file
+    
+    Raises ValueError if the file cannot be read to the end, so callers never
+    mistake the messages before the error for the whole mailbox.
+    """
     try:
-        # Read the JSON file content
-        content = uploaded_file.read().decode("utf-8")
-        data = json.loads(content)
-        
-        if not isinstance(data, list):
-            st.error("JSON file should contain a list of email messages")
-            return []
-        
-        return data
-        
+        yield from iter_json_records(uploaded_file)
     except json.JSONDecodeError as e:
-        st.error(f"Invalid JSON file: {str(e)}")
-        return []
+        raise ValueError(f"Invalid JSON file: {str(e)}") from e
     except Exception as e:
-        st.error(f"Error processing JSON file: {str(e)}")
-        return []
+        raise ValueError(f"Error processing JSON file: {str(e)}") from e
 
 def create_download_file(content: str, file_format: str) -> bytes:
     """Create downloadable file content"""
     try:
         if file_format.lower() == "docx":
+            import docx
+            
             doc = docx.Document()
             doc.add_paragraph(content)
             
@@ -101,6 +59,130 @@ def create_download_file(content: str, file_format: str) -> bytes:
         st.error(f"Error creating download file: {str(e)}")
         return content.encode('utf-8')
 
+@st.cache_resource(show_spinner=False, validate=lambda summarizer: summarizer.check_health())
+def get_summarizer() -> TextSummarizer:
+    """Process-wide summarizer shared by every session and rerun
+    
+    Sharing it keeps one keep-alive HTTP connection pool (and the in-memory cache
+    tier) warm instead of building a new client on every interaction. Streamlit
+    replaces it when the periodic health check fails; the old instance is not
+    closed, since other sessions may still have requests in flight on it, and
+    its connections are released once it is garbage collected.
+    """
+    return TextSummarizer()
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporter():
+    """Serve Prometheus metrics once per process when REEASE_METRICS_PORT is set"""
+    port = metrics.metrics_port()
+    return metrics.start_metrics_server(port) if port else None
+
+def summarize_uploaded_files(summarizer: TextSummarizer, uploaded_files, compression_ratio, precompress: str,
+                             download_format: str) -> None:
+    """Summarize several uploads concurrently, showing per-file progress and one ZIP download"""
+    st.markdown("### 📝 Generated Summaries")
+    progress = st.progress(0.0, text=f"Processing {len(uploaded_files)} files...")
+    rows = []
+    for uploaded_file in uploaded_files:
+        row = st.empty()
+        row.markdown(f"⏳ **{uploaded_file.name}** — waiting")
+        rows.append(row)
+    
+    files = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+    summaries = {}
+    failures = []
+    with SummaryArchive() as archive:
+        for event in summarize_files(summarizer, files, compression_ratio, precompress):
+            row = rows[event["index"]]
+            name = event["filename"]
+            if event["stage"] == "extracted":
+                row.markdown(f"✍️ **{name}** — {event['characters']:,} characters extracted, summarizing...")
+                continue
+            if event["stage"] == "summarized":
+                summaries[event["index"]] = event["summary"]
+                stem = os.path.splitext(name)[0]
+                archive.add(f"{stem}.summary.{download_format.lower()}",
+                            create_download_file(event["summary"], download_format))
+                row.markdown(f"✅ **{name}** — summarized")
+            else:
+                failures.append(f"{name}: {event['error']}")
+                row.markdown(f"❌ **{name}** — {event['error']}")
+            finished = len(summaries) + len(failures)
+            progress.progress(finished / len(files), text=f"{finished} of {len(files)} files processed")
+        
+        for index, summary in sorted(summaries.items()):
+            with st.expander(f"📄 {files[index][0]}"):
+                st.markdown(summary)
+        
+        if failures:
+            archive.add("errors.txt", "\n".join(failures).encode("utf-8"))
+            st.warning(f"⚠️ {len(failures)} of {len(files)} files could not be summarized")
+        if summaries:
+            st.success(f"✨ **{len(summaries)} summaries generated successfully!**")
+            st.download_button(
+                label=f"⬇️ Download all ({len(summaries)} files, ZIP)",
+                data=archive.finish(),
+                file_name="summaries.zip",
+                mime="application/zip"
+            )
+
+def summary_error_message(error: SummarizationError) -> str:
+    """User-facing explanation of why a summary could not be generated"""
+    if isinstance(error, ModelUnavailableError):
+        if error.retry_after:
+            return f"⏳ The AI model is busy right now. Please try again in {error.retry_after:.0f} seconds."
+        return "⏳ The AI model is temporarily unavailable. Please try again shortly."
+    return f"Failed to generate summary: {error}"
+
+# Local extractive pre-selection choices for the "Upload File" tab
+PRESELECT_METHODS = {"Off": "", "TF-IDF": "tfidf", "TextRank": "textrank"}
+
+# Live summarization in the "Enter Text" tab
+LIVE_DEBOUNCE_SECONDS = 0.8
+# Re-summarize the whole text after this many incremental updates to avoid drift
+LIVE_MAX_INCREMENTAL_UPDATES = 5
+
+def render_live_summary(summarizer: TextSummarizer, input_text: str, placeholder) -> None:
+    """Summarize the text box without re-sending text that was already summarized
+    
+    Reruns with unchanged input (e.g. other widget interactions) reuse the stored
+    summary. Changed input waits LIVE_DEBOUNCE_SECONDS first; an edit during that
+    pause reruns the script, which stops this run before any request is sent.
+    When text was only appended, the previous summary is updated with the delta.
+    """
+    state = st.session_state.setdefault("live_summary", {"text": "", "summary": "", "updates": 0})
+    text = input_text.strip()
+    
+    if text == state["text"] and state["summary"]:
+        placeholder.container(height=400).markdown(state["summary"])
+        return
+    
+    # Debounce rapid edits
+    placeholder.container(height=400).caption("Waiting for you to finish typing...")
+    time.sleep(LIVE_DEBOUNCE_SECONDS)
+    
+    previous_text, previous_summary = state["text"], state["summary"]
+    appended = text[len(previous_text):] if previous_text and text.startswith(previous_text) else None
+    incremental = (
+        bool(previous_summary)
+        and appended is not None
+        and len(appended) <= len(previous_text)
+        and state["updates"] < LIVE_MAX_INCREMENTAL_UPDATES
+    )
+    
+    with placeholder.container(height=400):
+        try:
+            if incremental:
+                summary = st.write_stream(summarizer.stream_summary_update(previous_summary, appended))
+            else:
+                summary = st.write_stream(summarizer.stream_summary(text))
+        except SummarizationError as e:
+            st.error(summary_error_message(e))
+            return
+    
+    if summary:
+        state.update(text=text, summary=summary, updates=state["updates"] + 1 if incremental else 0)
+
 def main():
     # Page config
     st.set_page_config(
@@ -220,13 +302,15 @@ def main():
     
     st.markdown("---")
     
+    start_metrics_exporter()
+    
     # Check for API key
     if not os.environ.get("GEMINI_API_KEY"):
         st.error("⚠️ GEMINI_API_KEY environment variable is not set. Please configure your API key to use this application.")
         st.stop()
     
     try:
-        summarizer = TextSummarizer()
+        summarizer = get_summarizer()
     except Exception as e:
         st.error(f"Failed to initialize summarizer: {str(e)}")
         st.stop()
@@ -244,14 +328,19 @@ def main():
         st.markdown("### 📁 File Upload")
         st.markdown("Drag and drop or browse to upload your document")
         
-        uploaded_file = st.file_uploader(
-            "Choose a file", 
+        uploaded_files = st.file_uploader(
+            "Choose files", 
             type=["pdf", "docx", "txt", "pptx"],
-            help="Supported formats: PDF, Word, Text, PowerPoint"
+            accept_multiple_files=True,
+            help="Supported formats: PDF, Word, Text, PowerPoint. Select several files to summarize them together"
         )
+        uploaded_file = uploaded_files[0] if uploaded_files else None
         
-        if uploaded_file is not None:
-            st.success(f"✅ File '{uploaded_file.name}' uploaded successfully!")
+        if uploaded_files:
+            if len(uploaded_files) == 1:
+                st.success(f"✅ File '{uploaded_file.name}' uploaded successfully!")
+            else:
+                st.success(f"✅ {len(uploaded_files)} files uploaded successfully!")
             
             # Summarization options
             col1, col2 = st.columns(2)
@@ -269,21 +358,47 @@ def main():
                     help="Choose the format for the downloaded summary"
                 )
             
-            if st.button("🚀 Generate Summary", type="primary"):
+            preselect = st.selectbox(
+                "Key Sentence Pre-selection",
+                list(PRESELECT_METHODS),
+                help="For long documents summarized to 25% or 50%, send only the most representative "
+                     "sentences (picked locally) to the AI model: faster and cheaper, slightly less thorough"
+            )
+            
+            if len(uploaded_files) > 1:
+                if st.button("🚀 Generate Summaries", type="primary"):
+                    compression_ratio = None if compression == "Regular" else compression
+                    summarize_uploaded_files(summarizer, uploaded_files, compression_ratio,
+                                             PRESELECT_METHODS[preselect], download_format)
+            
+            elif st.button("🚀 Generate Summary", type="primary"):
                 with st.spinner("Extracting text from file..."):
                     extracted_text = extract_text_from_file(uploaded_file)
                 
                 if extracted_text:
                     st.success("✅ Text extracted successfully!")
                     
-                    with st.spinner("Generating AI summary..."):
-                        compression_ratio = None if compression == "Regular" else compression
-                        summary = summarizer.generate_summary(extracted_text, compression_ratio)
+                    st.markdown("### 📝 Generated Summary")
+                    compression_ratio = None if compression == "Regular" else compression
+                    # Render tokens as the model streams them instead of waiting for the full reply
+                    summary_stats = {}
+                    with st.container(height=300):
+                        try:
+                            summary = st.write_stream(summarizer.stream_summary(
+                                extracted_text, compression_ratio, precompress=PRESELECT_METHODS[preselect],
+                                stats=summary_stats
+                            ))
+                        except SummarizationError as e:
+                            st.error(summary_error_message(e))
+                            summary = None
                     
                     if summary:
-                        st.markdown("### 📝 Generated Summary")
                         st.success("✨ **AI Summary Generated Successfully!**")
-                        st.text_area("", summary, height=300, disabled=True, label_visibility="collapsed")
+                        stats = summary_stats.get("precompress")
+                        if stats:
+                            st.caption(f"Pre-selected {stats['kept_sentences']:,} of {stats['sentences']:,} sentences "
+                                       f"({stats['input_tokens']:,} → {stats['output_tokens']:,} tokens) "
+                                       f"in {stats['seconds']:.2f}s")
                         
                         # Download functionality
                         file_content = create_download_file(summary, download_format)
@@ -295,8 +410,6 @@ def main():
                             file_name=file_name,
                             mime="application/octet-stream"
                         )
-                    else:
-                        st.error("Failed to generate summary. Please try again.")
                 else:
                     st.error("No text could be extracted from the file. Please check the file format and content.")
     
@@ -320,15 +433,7 @@ def main():
             summary_placeholder = st.empty()
             
             if input_text.strip():
-                with st.spinner("Generating summary..."):
-                    summary = summarizer.generate_summary(input_text)
-                summary_placeholder.text_area(
-                    "Generated summary",
-                    summary,
-                    height=400,
-                    disabled=True,
-                    label_visibility="collapsed"
-                )
+                render_live_summary(summarizer, input_text, summary_placeholder)
             else:
                 summary_placeholder.text_area(
                     "Generated summary",
@@ -344,44 +449,100 @@ def main():
         
         uploaded_json = st.file_uploader(
             "Choose a JSON file", 
-            type=["json"],
-            help="JSON file should contain email thread data with thread_id and body fields"
+            type=["json", "jsonl"],
+            help="JSON array or JSON Lines file of email messages with thread_id and body fields"
         )
         
         if uploaded_json is not None:
             st.success(f"✅ JSON file '{uploaded_json.name}' uploaded successfully!")
             
+            pack_threads = st.checkbox(
+                "📦 Pack short threads into fewer requests",
+                value=True,
+                help="Summarize several short threads per model request; any thread missing from the reply is retried on its own"
+            )
+            sorted_by_thread = st.checkbox(
+                "🧵 Messages are sorted by thread",
+                value=False,
+                help="Summarize each thread as soon as the file moves on to the next one instead of reading the whole "
+                     "file first. Only use this if all messages of a thread are next to each other, otherwise a "
+                     "thread is split into several summaries"
+            )
+            
             if st.button("🚀 Generate Thread Summaries", type="primary"):
-                with st.spinner("Processing JSON file..."):
-                    json_data = process_json_file(uploaded_json)
+                st.markdown("### 📝 Thread Summaries")
+                summaries = []
+                complete = False
                 
-                if json_data:
+                try:
                     with st.spinner("Generating summaries for email threads..."):
-                        summaries = summarizer.summarize_json_threads(json_data)
-                    
-                    if summaries:
-                        st.markdown("### 📝 Thread Summaries")
-                        st.success(f"✨ **Generated {len(summaries)} thread summaries!**")
-                        
-                        # Display summaries
-                        for i, summary in enumerate(summaries):
+                        # Messages are parsed and grouped incrementally, and each
+                        # summary is displayed as soon as its thread completes; unless
+                        # the file is sorted by thread, grouping reads it all first
+                        thread_groups = group_threads(process_json_file(uploaded_json), contiguous=sorted_by_thread)
+                        for summary in summarizer.iter_thread_summaries(thread_groups, pack=pack_threads):
+                            summaries.append(summary)
                             with st.expander(f"Thread {summary.get('thread_id', 'Unknown')}"):
-                                st.write(summary.get('body', 'No summary available'))
-                        
-                        # Download functionality
-                        json_content = json.dumps(summaries, indent=2)
-                        
-                        st.download_button(
-                            label="⬇️ Download JSON Summary",
-                            data=json_content.encode('utf-8'),
-                            file_name="thread_summaries.json",
-                            mime="application/json"
-                        )
+                                if 'error' in summary:
+                                    st.error(f"Failed to generate summary for this thread: {summary['error']}")
+                                else:
+                                    st.write(summary.get('body', 'No summary available'))
+                                if summary.get('tokens_saved'):
+                                    st.caption(f"✂️ {summary['tokens_saved']:,} tokens of quoted or repeated text removed")
+                        complete = True
+                except ValueError as e:
+                    st.error(str(e))
+                
+                if summaries:
+                    failed = sum(1 for summary in summaries if 'error' in summary)
+                    if complete:
+                        st.success(f"✨ **Generated {len(summaries) - failed} thread summaries!**")
                     else:
-                        st.error("Failed to generate summaries. Please check your JSON file format.")
-                else:
-                    st.error("Failed to process JSON file. Please check the file format.")
+                        st.warning(f"⚠️ The file could not be read to the end, so these {len(summaries)} summaries "
+                                   "only cover the threads before the error.")
+                    if failed:
+                        st.warning(f"⚠️ {failed} threads could not be summarized; they are listed with their errors in the download.")
+                    tokens_saved = sum(summary.get('tokens_saved', 0) for summary in summaries)
+                    if tokens_saved:
+                        st.info(f"✂️ Removed about {tokens_saved:,} tokens of quoted replies, signatures and duplicate messages")
+                    
+                    # Download functionality
+                    json_content = json.dumps(summaries, indent=2)
+                    
+                    st.download_button(
+                        label="⬇️ Download JSON Summary" if complete else "⬇️ Download Partial JSON Summary",
+                        data=json_content.encode('utf-8'),
+                        file_name="thread_summaries.json" if complete else "thread_summaries_partial.json",
+                        mime="application/json"
+                    )
+                elif complete:
+                    st.error("Failed to generate summaries. Please check your JSON file format.")
+    
+    # Summary cache effectiveness (rendered last so it includes this run)
+    if summarizer.cache is not None:
+        cache_stats = summarizer.cache.stats()
+        with st.sidebar:
+            st.markdown("---")
+            st.markdown("### 🗄️ Summary Cache")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            with col2:
+                st.metric("Time Saved", f"{cache_stats['saved_seconds']:.1f}s")
+            st.caption(
+                f"{cache_stats['memory_hits'] + cache_stats['disk_hits']} hits • "
+                f"{cache_stats['misses']} misses • ~{cache_stats['saved_tokens']:,} tokens saved"
+            )
     
+    extraction_stats = get_default_extraction_cache().stats()
+    if extraction_stats['entries']:
+        with st.sidebar:
+            st.caption(
+                f"📄 {extraction_stats['entries']} parsed documents cached "
+                f"({extraction_stats['disk_bytes'] / 1024 / 1024:.1f} MB) • "
+                f"{extraction_stats['hits']} re-parses skipped"
+            )
+
     # Enhanced Footer
     st.markdown("---")
     st.markdown("""
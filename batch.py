@@ -0,0 +1,221 @@
+"""Headless batch summarization of whole directories.
+
+Extraction (CPU bound) runs in a process pool while summarization (network
+bound) runs in a thread pool, so the two stages overlap. Each finished file is
+appended to a JSONL output as soon as it completes; that file doubles as the
+checkpoint, so re-running the same command after a crash skips every file
+already summarized (matched by path, size and modification time).
+
+Usage:
+
+    python batch.py reports/ "archive/**/*.pdf" -o summaries.jsonl --compression 25%
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from extractors import extract_text, file_process_pool, supported_extensions
+from metrics import metrics_port, start_metrics_server
+
+COMPRESSION_CHOICES = ["Regular", "25%", "50%", "75%"]
+
+Fingerprint = Tuple[str, int, int]
+
+
+def iter_input_files(inputs: Iterable[str], extensions: Iterable[str]) -> Iterator[str]:
+    """Expand files, directories (recursively) and glob patterns into unique file paths"""
+    extensions = {f".{ext}" for ext in extensions}
+    seen: Set[str] = set()
+    
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates: Iterable[str] = (
+                os.path.join(root, name)
+                for root, _, names in os.walk(item)
+                for name in sorted(names)
+            )
+            candidates = (path for path in candidates if os.path.splitext(path)[1].lower() in extensions)
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        
+        for path in candidates:
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def fingerprint(path: str) -> Fingerprint:
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def load_checkpoint(output_path: str) -> Set[Fingerprint]:
+    """Fingerprints of files already summarized successfully in a previous run"""
+    completed: Set[Fingerprint] = set()
+    if not os.path.exists(output_path):
+        return completed
+    
+    with open(output_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated final line behind
+                continue
+            if "summary" in record:
+                completed.add((record["path"], record["size"], record["mtime_ns"]))
+    return completed
+
+
+class JsonlWriter:
+    """Append-only JSONL sink that makes every record durable before returning"""
+    
+    def __init__(self, path: str):
+        self._fh = open(path, "a+", encoding="utf-8")
+        # Terminate a partial line left by an interrupted run
+        if self._fh.tell() > 0:
+            self._fh.seek(self._fh.tell() - 1)
+            if self._fh.read(1) != "\n":
+                self._fh.write("\n")
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+    
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _extract_file(path: str) -> Tuple[str, float]:
+    """Process-pool task: extract the text of one file"""
+    started = time.perf_counter()
+    with open(path, "rb") as fh:
+        text = extract_text(fh, path)
+    return text, time.perf_counter() - started
+
+
+def _summarize(summarizer, text: str, compression_ratio: Optional[str]) -> Tuple[str, float]:
+    started = time.perf_counter()
+    summary = summarizer.generate_summary(text, compression_ratio)
+    return summary, time.perf_counter() - started
+
+
+def run_batch(paths: List[str], output_path: str, summarizer, compression_ratio: Optional[str] = None,
+              extract_workers: Optional[int] = None, summarize_workers: int = 8) -> Dict[str, int]:
+    """Summarize ``paths`` into ``output_path``, skipping files recorded there already"""
+    completed = load_checkpoint(output_path)
+    todo = [fp for fp in map(fingerprint, paths) if fp not in completed]
+    counts = {"total": len(paths), "skipped": len(paths) - len(todo), "succeeded": 0, "failed": 0}
+    if not todo:
+        return counts
+    
+    extract_workers = extract_workers or os.cpu_count() or 1
+    # Bound the files held in memory between the two stages
+    max_in_flight = extract_workers + summarize_workers * 2
+    
+    writer = JsonlWriter(output_path)
+    extract_pool = file_process_pool(extract_workers)
+    summarize_pool = ThreadPoolExecutor(max_workers=summarize_workers, thread_name_prefix="reease-batch")
+    
+    pending: Dict[Future, Tuple[str, Fingerprint, float]] = {}
+    queue = iter(todo)
+    
+    def top_up() -> None:
+        while len(pending) < max_in_flight:
+            fp = next(queue, None)
+            if fp is None:
+                return
+            pending[extract_pool.submit(_extract_file, fp[0])] = ("extract", fp, 0.0)
+    
+    def finish(fp: Fingerprint, **fields: Any) -> None:
+        path, size, mtime_ns = fp
+        record = {"path": path, "size": size, "mtime_ns": mtime_ns, **fields}
+        writer.write(record)
+        outcome = "succeeded" if "summary" in record else "failed"
+        counts[outcome] += 1
+        done = counts["succeeded"] + counts["failed"]
+        logging.info(f"[{done}/{len(todo)}] {outcome}: {path}")
+    
+    try:
+        top_up()
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, fp, extract_seconds = pending.pop(future)
+                try:
+                    if stage == "extract":
+                        text, extract_seconds = future.result()
+                        if not text:
+                            finish(fp, error="No text could be extracted from the file")
+                            continue
+                        summary_future = summarize_pool.submit(_summarize, summarizer, text, compression_ratio)
+                        pending[summary_future] = ("summarize", fp, extract_seconds)
+                    else:
+                        summary, summarize_seconds = future.result()
+                        finish(fp, summary=summary, compression=compression_ratio or "Regular",
+                               extract_seconds=round(extract_seconds, 3),
+                               summarize_seconds=round(summarize_seconds, 3))
+                except Exception as e:
+                    finish(fp, error=f"{stage} failed: {e}")
+            top_up()
+    finally:
+        extract_pool.shutdown(cancel_futures=True)
+        summarize_pool.shutdown(cancel_futures=True)
+        writer.close()
+    
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize documents in bulk into a JSONL file.")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="summaries.jsonl", help="JSONL output and checkpoint file")
+    parser.add_argument("--compression", choices=COMPRESSION_CHOICES, default="Regular", help="summary length")
+    parser.add_argument("--extract-workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    parser.add_argument("--summarize-workers", type=int, default=8, help="concurrent summarization requests")
+    parser.add_argument("--rpm", type=int, default=None, help="max model requests per minute")
+    parser.add_argument("--tpm", type=int, default=None, help="max model tokens per minute")
+    parser.add_argument("--metrics-port", type=int, default=metrics_port(), help="serve Prometheus /metrics on this port")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every completed file")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    
+    # Imported here so --help works without the model SDK configured
+    from summarizer import TextSummarizer
+    
+    try:
+        summarizer = TextSummarizer(max_concurrency=args.summarize_workers,
+                                    requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    except Exception as e:
+        print(f"Failed to initialize summarizer: {e}", file=sys.stderr)
+        return 2
+    
+    paths = list(iter_input_files(args.inputs, supported_extensions()))
+    compression_ratio = None if args.compression == "Regular" else args.compression
+    counts = run_batch(paths, args.output, summarizer, compression_ratio,
+                       args.extract_workers, args.summarize_workers)
+    
+    print(f"{counts['succeeded']} summarized, {counts['failed']} failed, "
+          f"{counts['skipped']} already done (of {counts['total']}) -> {args.output}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Cold-start import cost of the extractor layer.
+
+Compares the imports app.py used to perform eagerly (PyPDF2, python-docx,
+python-pptx and, when installed, textract) with importing the lazy extractor
+registry. Each statement runs in a fresh interpreter; the cost of starting an
+empty interpreter is subtracted.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time [--runs 15]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+EAGER_IMPORTS = """
+import PyPDF2, docx, pptx
+try:
+    import textract
+except ImportError:
+    pass
+"""
+
+CASES = [
+    ("interpreter baseline", "pass"),
+    ("eager backends (previous app.py)", EAGER_IMPORTS),
+    ("lazy extractor registry", "import extractors"),
+    ("registry + first PDF lookup", "import extractors; extractors.get_extractor('a.pdf').load()"),
+]
+
+
+def time_statement(statement: str, runs: int) -> float:
+    """Median wall time, in seconds, to run ``statement`` in a new interpreter"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15, help="interpreter launches per case")
+    args = parser.parse_args()
+    
+    results = [(label, time_statement(statement, args.runs)) for label, statement in CASES]
+    baseline = results[0][1]
+    
+    print(f"{'case':<36} {'median':>10} {'import cost':>12}")
+    for label, seconds in results:
+        print(f"{label:<36} {seconds * 1000:>8.1f}ms {(seconds - baseline) * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
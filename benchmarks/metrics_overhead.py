@@ -0,0 +1,64 @@
+"""Cost of the built-in instrumentation on the hot paths.
+
+Measures the per-call overhead of a metrics span and a labelled counter, and
+of a full generate_summary / summarize_json_threads round trip against a
+zero-latency fake model, with recording enabled and disabled.
+
+Run from the repository root:
+
+    python -m benchmarks.metrics_overhead [--iterations 200000]
+"""
+import argparse
+import logging
+import time
+from typing import Callable
+
+import metrics
+from fake_model import FakeGeminiClient
+from summarizer import TextSummarizer
+
+
+def per_call_us(func: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def compare(label: str, func: Callable[[], object], iterations: int) -> None:
+    results = {}
+    for enabled in (False, True):
+        metrics.ENABLED = enabled
+        func()  # warm up
+        results[enabled] = per_call_us(func, iterations)
+    overhead = results[True] - results[False]
+    print(f"{label:<38} {results[False]:>10.2f}us {results[True]:>10.2f}us {overhead:>+10.2f}us")
+
+
+def empty_span() -> None:
+    with metrics.span("benchmark"):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000, help="iterations for micro benchmarks")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    summarizer = TextSummarizer(client=FakeGeminiClient(latency=0, tokens_per_second=0), use_cache=False,
+                                max_concurrency=1)
+    document = "The quarterly report covers revenue, hiring and the database migration. " * 50
+    mailbox = [{"thread_id": i % 20, "body": "Please review the attached budget before Friday."} for i in range(100)]
+    round_trips = max(1, args.iterations // 100)
+    
+    print(f"{'operation':<38} {'disabled':>12} {'enabled':>12} {'overhead':>12}")
+    compare("span()", empty_span, args.iterations)
+    compare("counter.inc(labels)", lambda: metrics.CHARACTERS.inc(10, operation="x", direction="y"), args.iterations)
+    compare("generate_summary (fake model)", lambda: summarizer.generate_summary(document, "25%"), round_trips)
+    compare("summarize_json_threads (20 threads)", lambda: summarizer.summarize_json_threads(mailbox),
+            max(1, round_trips // 20))
+
+
+if __name__ == "__main__":
+    main()
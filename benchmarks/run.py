@@ -0,0 +1,420 @@
+"""Offline throughput/latency benchmarks for REEase.
+
+Every scenario runs in a fresh process so its peak RSS is measured in
+isolation. Model calls go to fake_model.FakeGeminiClient, so no network or
+GEMINI_API_KEY is needed and results are comparable between runs.
+
+Suites:
+  extraction  extract_text on the bundled PDF and DOCX and generated DOCX/PPTX
+              files, with the python-docx/python-pptx object-model extraction
+              the streaming OOXML parser replaced as a reference
+  summarize   generate_summary on one document at each compression ratio,
+              plus a document large enough for the map-reduce pipeline
+  threads     summarize_json_threads on synthetic mailboxes, one request per
+              thread and with short threads packed into shared requests
+  precompress generate_summary with local extractive pre-selection (TF-IDF and
+              TextRank) against the full document, reporting prompt tokens,
+              local scoring time and keyword coverage of the selected text;
+              the fake model charges for prompt length here by default
+
+Run from the repository root:
+
+    python -m benchmarks.run --suite all --json bench.json
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import sys
+import tempfile
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_PATH = os.path.join(ROOT, "dataset", "database19c-wp.pdf")
+DOCX_PATH = os.path.join(ROOT, "dataset", "summary.docx")
+
+SUITES = ["extraction", "summarize", "threads", "precompress"]
+RATIOS = [None, "25%", "50%", "75%"]
+PRECOMPRESS_RATIOS = ["25%", "50%"]
+PRECOMPRESS_METHODS = [None, "tfidf", "textrank"]
+# Prompt processing rate the precompress suite assumes unless --prefill-tokens-per-second is given,
+# so shorter prompts pay off the way they do against the real model
+PRECOMPRESS_PREFILL_TOKENS_PER_SECOND = 10000.0
+# Keyword coverage counts how many of the document's most frequent content words survive pre-selection
+COVERAGE_KEYWORDS = 100
+VOCABULARY = (
+    "budget review meeting schedule deadline contract invoice approval release "
+    "customer escalation roadmap migration database outage incident followup "
+    "vendor proposal signoff quarter forecast hiring onboarding security audit"
+).split()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def make_result(name: str, count: int, seconds: float, unit: str, latencies: List[float],
+                **extra: Any) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "count": count,
+        "seconds": round(seconds, 3),
+        "throughput": round(count / seconds, 2) if seconds else 0.0,
+        "unit": unit,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        **extra,
+    }
+
+
+def fake_summarizer(args: argparse.Namespace, default_prefill: float = 0.0, **kwargs: Any):
+    from fake_model import FakeGeminiClient
+    from summarizer import TextSummarizer
+    
+    prefill = args.prefill_tokens_per_second
+    client = FakeGeminiClient(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                              error_rate=args.error_rate, straggler_rate=args.straggler_rate,
+                              prefill_tokens_per_second=default_prefill if prefill is None else prefill,
+                              seed=args.seed)
+    return TextSummarizer(client=client, use_cache=False, max_concurrency=args.concurrency,
+                          hedge_requests=args.hedge, **kwargs)
+
+
+def build_pptx(path: str, slides: int) -> None:
+    """Write a synthetic deck with a title, body text and notes on every slide"""
+    import pptx
+    
+    rng = random.Random(0)
+    deck = pptx.Presentation()
+    layout = deck.slide_layouts[1]
+    for index in range(slides):
+        slide = deck.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {index + 1}: {' '.join(rng.choices(VOCABULARY, k=4))}"
+        slide.placeholders[1].text = "\n".join(" ".join(rng.choices(VOCABULARY, k=12)) for _ in range(5))
+        slide.notes_slide.notes_text_frame.text = " ".join(rng.choices(VOCABULARY, k=30))
+    deck.save(path)
+
+
+def build_docx(path: str, sections: int) -> None:
+    """Write a synthetic manual: headings, body paragraphs and a table in every section"""
+    import docx
+    
+    rng = random.Random(0)
+    document = docx.Document()
+    for index in range(sections):
+        document.add_heading(f"Section {index + 1}: {' '.join(rng.choices(VOCABULARY, k=3))}", 1)
+        for _ in range(8):
+            document.add_paragraph(" ".join(rng.choices(VOCABULARY, k=40)))
+        table = document.add_table(rows=4, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = " ".join(rng.choices(VOCABULARY, k=2))
+    document.save(path)
+
+
+def object_model_docx(file_obj) -> str:
+    """The python-docx extraction the streaming parser replaced (body paragraphs only)"""
+    import docx
+    
+    doc = docx.Document(file_obj)
+    return "\n".join(paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip())
+
+
+def object_model_pptx(file_obj) -> str:
+    """The python-pptx extraction the streaming parser replaced (slide shapes only)"""
+    import pptx
+    
+    ppt = pptx.Presentation(file_obj)
+    return "\n".join(
+        shape.text
+        for slide in ppt.slides
+        for shape in slide.shapes
+        if hasattr(shape, "text") and shape.text.strip()
+    )
+
+
+def time_extraction(name: str, path: str, repeat: int,
+                    extract: Optional[Callable[[Any], str]] = None) -> Dict[str, Any]:
+    from extractors import extract_text
+    
+    latencies = []
+    chars = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with open(path, "rb") as fh:
+            # Bypass the extraction cache so every iteration parses the file
+            chars = len(extract(fh) if extract else extract_text(fh, path, cache=False))
+        latencies.append(time.perf_counter() - started)
+    size_mb = os.path.getsize(path) / 1e6
+    return make_result(name, repeat, sum(latencies), "files/s", latencies,
+                       file_mb=round(size_mb, 2), chars=chars)
+
+
+def scenario_extract_pdf(args: argparse.Namespace) -> Dict[str, Any]:
+    return time_extraction("extract pdf", PDF_PATH, args.repeat)
+
+
+def make_office_scenario(kind: str, object_model: bool) -> Callable[[argparse.Namespace], Dict[str, Any]]:
+    def scenario(args: argparse.Namespace) -> Dict[str, Any]:
+        extract = (object_model_docx if kind != "pptx" else object_model_pptx) if object_model else None
+        label = " (object model)" if object_model else ""
+        if kind == "docx":
+            return time_extraction(f"extract docx{label}", DOCX_PATH, args.repeat, extract)
+        with tempfile.TemporaryDirectory() as tmp:
+            if kind == "pptx":
+                path = os.path.join(tmp, "synthetic.pptx")
+                build_pptx(path, slides=200)
+                name = "extract pptx (200 slides)"
+            else:
+                path = os.path.join(tmp, "synthetic.docx")
+                build_docx(path, sections=300)
+                name = "extract docx (300 sections)"
+            return time_extraction(f"{name}{label}", path, args.repeat, extract)
+    return scenario
+
+
+def _document_text() -> str:
+    from extractors import extract_text
+    
+    with open(PDF_PATH, "rb") as fh:
+        return extract_text(fh, PDF_PATH)
+
+
+def _time_summaries(name: str, summarizer, text: str, ratio: Optional[str], repeat: int) -> Dict[str, Any]:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        summarizer.generate_summary(text, ratio)
+        latencies.append(time.perf_counter() - started)
+    stats = summarizer.client.stats()
+    return make_result(name, repeat, sum(latencies), "docs/s", latencies,
+                       requests=stats["requests"], prompt_tokens=stats["prompt_tokens"],
+                       output_tokens=stats["output_tokens"])
+
+
+def make_summarize_scenario(ratio: Optional[str]) -> Callable[[argparse.Namespace], Dict[str, Any]]:
+    def scenario(args: argparse.Namespace) -> Dict[str, Any]:
+        summarizer = fake_summarizer(args)
+        return _time_summaries(f"summarize pdf ({ratio or 'Regular'})", summarizer, _document_text(), ratio, args.repeat)
+    return scenario
+
+
+def scenario_summarize_large(args: argparse.Namespace) -> Dict[str, Any]:
+    # Twenty copies of the white paper (~280k tokens) exercise map-reduce
+    summarizer = fake_summarizer(args)
+    text = "\f".join([_document_text()] * 20)
+    return _time_summaries("summarize 20x pdf (map-reduce, 25%)", summarizer, text, "25%", max(1, args.repeat // 5))
+
+
+def keyword_coverage(document: str, selected: str) -> float:
+    """Fraction of the document's most frequent content words that appear in the selected text"""
+    from collections import Counter
+    from extractive import STOPWORDS, _WORD_RE
+    
+    def content_words(text: str) -> List[str]:
+        return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+    
+    keywords = [word for word, _ in Counter(content_words(document)).most_common(COVERAGE_KEYWORDS)]
+    present = set(content_words(selected))
+    return sum(1 for word in keywords if word in present) / len(keywords) if keywords else 1.0
+
+
+def make_precompress_scenario(ratio: str, method: Optional[str],
+                              copies: int = 1) -> Callable[[argparse.Namespace], Dict[str, Any]]:
+    def scenario(args: argparse.Namespace) -> Dict[str, Any]:
+        from extractive import compress_text
+        
+        summarizer = fake_summarizer(args, PRECOMPRESS_PREFILL_TOKENS_PER_SECOND, precompress=method or "")
+        text = "\f".join([_document_text()] * copies)
+        repeat = args.repeat if copies == 1 else max(1, args.repeat // 5)
+        label = f"{copies}x pdf" if copies > 1 else "pdf"
+        result = _time_summaries(f"precompress {label} ({ratio}, {method or 'off'})", summarizer, text, ratio, repeat)
+        coverage, scoring_seconds = 1.0, 0.0
+        budget = summarizer._precompress_budget(text, ratio, method) if method else None
+        if budget is not None:
+            selected, stats = compress_text(text, budget, method)
+            coverage, scoring_seconds = keyword_coverage(text, selected), stats["seconds"]
+        result.update(precompress_seconds=scoring_seconds, keyword_coverage=round(coverage, 3))
+        return result
+    return scenario
+
+
+def synthetic_mailbox(messages: int, seed: int) -> List[Dict[str, Any]]:
+    """Messages spread over threads of 1-10 messages, shuffled like a real export
+    
+    Every reply quotes the full message it answers, as mail clients do by default.
+    """
+    rng = random.Random(seed)
+    mailbox = []
+    thread_id = 0
+    while len(mailbox) < messages:
+        previous = ""
+        for _ in range(min(rng.randint(1, 10), messages - len(mailbox))):
+            body = ". ".join(" ".join(rng.choices(VOCABULARY, k=rng.randint(6, 14))) for _ in range(rng.randint(1, 6)))
+            if previous:
+                quoted = "\n".join(f"> {line}" for line in previous.splitlines())
+                body = f"{body}\n\nOn Mon, Jan 5, 2026 at 10:00 AM someone wrote:\n{quoted}"
+            mailbox.append({"thread_id": f"t{thread_id}", "body": body})
+            previous = body
+        thread_id += 1
+    rng.shuffle(mailbox)
+    return mailbox
+
+
+def make_threads_scenario(messages: int, pack: bool = False) -> Callable[[argparse.Namespace], Dict[str, Any]]:
+    def scenario(args: argparse.Namespace) -> Dict[str, Any]:
+        summarizer = fake_summarizer(args)
+        mailbox = synthetic_mailbox(messages, args.seed)
+        
+        # Time every thread end to end, including time queued for a worker
+        # (all threads in a packed request share that request's latency)
+        latencies: List[float] = []
+        summarize_batch = summarizer._summarize_thread_batch
+        
+        def timed(batch: List[Any]) -> List[Dict[str, Any]]:
+            started = time.perf_counter()
+            try:
+                return summarize_batch(batch)
+            finally:
+                latencies.extend([time.perf_counter() - started] * len(batch))
+        
+        summarizer._summarize_thread_batch = timed
+        started = time.perf_counter()
+        summaries = summarizer.summarize_json_threads(mailbox, pack=pack)
+        seconds = time.perf_counter() - started
+        stats = summarizer.client.stats()
+        name = f"threads{' packed' if pack else ''} ({messages} messages)"
+        return make_result(name, len(mailbox), seconds, "msgs/s", latencies,
+                           threads=len(summaries), requests=stats["requests"],
+                           prompt_tokens=stats["prompt_tokens"],
+                           tokens_saved=sum(summary.get("tokens_saved", 0) for summary in summaries),
+                           failures=sum(1 for summary in summaries if "error" in summary))
+    return scenario
+
+
+def scenarios_for(args: argparse.Namespace) -> List[Callable[[argparse.Namespace], Dict[str, Any]]]:
+    selected = SUITES if args.suite == "all" else [args.suite]
+    scenarios: List[Callable[[argparse.Namespace], Dict[str, Any]]] = []
+    if "extraction" in selected:
+        scenarios.append(scenario_extract_pdf)
+        scenarios += [make_office_scenario(kind, object_model)
+                      for kind in ("docx", "large-docx", "pptx") for object_model in (True, False)]
+    if "summarize" in selected:
+        scenarios += [make_summarize_scenario(ratio) for ratio in RATIOS]
+        scenarios.append(scenario_summarize_large)
+    if "threads" in selected:
+        scenarios += [make_threads_scenario(size) for size in args.mailbox_sizes]
+        scenarios += [make_threads_scenario(size, pack=True) for size in args.mailbox_sizes]
+    if "precompress" in selected:
+        for copies in (1, 20):
+            scenarios += [make_precompress_scenario(ratio, method, copies)
+                          for ratio in PRECOMPRESS_RATIOS for method in PRECOMPRESS_METHODS]
+    return scenarios
+
+
+def _run_in_child(index: int, args: argparse.Namespace, results) -> None:
+    sys.path.insert(0, ROOT)
+    # Fake failures would otherwise flood stderr with per-thread errors
+    logging.disable(logging.CRITICAL)
+    try:
+        scenario = scenarios_for(args)[index]
+        result = scenario(args)
+    except Exception as e:
+        traceback.print_exc()
+        results.put({"name": f"scenario #{index + 1}", "error": f"{type(e).__name__}: {e}"})
+        return
+    # ru_maxrss is reported in kilobytes on Linux
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    results.put(result)
+
+
+def _wait_for_result(process, results) -> Dict[str, Any]:
+    """The child's result, or an error entry if it died without reporting one"""
+    while True:
+        try:
+            return results.get(timeout=1.0)
+        except queue.Empty:
+            if not process.is_alive():
+                # The child may have put its result just before exiting
+                try:
+                    return results.get(timeout=1.0)
+                except queue.Empty:
+                    return {"error": f"process exited with code {process.exitcode}"}
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for index in range(len(scenarios_for(args))):
+        child_results = context.Queue()
+        process = context.Process(target=_run_in_child, args=(index, args, child_results))
+        process.start()
+        result = _wait_for_result(process, child_results)
+        process.join()
+        result.setdefault("name", f"scenario #{index + 1}")
+        print_row(result)
+        results.append(result)
+    return results
+
+
+def print_header() -> None:
+    print(f"{'scenario':<40} {'count':>7} {'seconds':>8} {'throughput':>16} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'peak RSS':>9} {'prompt tok':>11} {'coverage':>9}")
+
+
+def print_row(result: Dict[str, Any]) -> None:
+    if "error" in result:
+        print(f"{result['name']:<40} FAILED: {result['error']}", flush=True)
+        return
+    throughput = f"{result['throughput']} {result['unit']}"
+    # Only the model-backed suites send prompts, and only precompress measures coverage
+    prompt_tokens = result.get("prompt_tokens", "-")
+    coverage = f"{result['keyword_coverage']:.0%}" if "keyword_coverage" in result else "-"
+    print(f"{result['name']:<40} {result['count']:>7} {result['seconds']:>8} {throughput:>16} "
+          f"{result['p50_ms']:>9} {result['p99_ms']:>9} {result['peak_rss_mb']:>7}MB "
+          f"{prompt_tokens:>11} {coverage:>9}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline REEase benchmarks with a fake model backend.")
+    parser.add_argument("--suite", choices=SUITES + ["all"], default="all")
+    parser.add_argument("--repeat", type=int, default=5, help="iterations for extraction and single-document runs")
+    parser.add_argument("--mailbox-sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[10, 1000, 10000, 100000], help="comma-separated message counts")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake model time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0, help="fake model output throughput")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=None,
+                        help="fake model prompt processing rate (0 makes prompt length free; default: "
+                             f"{PRECOMPRESS_PREFILL_TOKENS_PER_SECOND:g} in the precompress suite, 0 elsewhere)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake requests that fail")
+    parser.add_argument("--straggler-rate", type=float, default=0.0,
+                        help="fraction of fake requests that take 2s to first token")
+    parser.add_argument("--hedge", action="store_true", help="hedge requests running past the p95 latency")
+    parser.add_argument("--concurrency", type=int, default=16, help="TextSummarizer max_concurrency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args()
+    
+    print_header()
+    results = run(args)
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"args": vars(args), "results": results}, fh, indent=2)
+    if any("error" in result for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
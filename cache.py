@@ -0,0 +1,392 @@
+import getpass
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+import metrics
+
+
+def _user_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME", "")
+    if not os.path.isabs(base):
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    if not os.path.isabs(base):
+        # No home directory to expand "~" to
+        base = os.path.join(tempfile.gettempdir(), f"reease-{getpass.getuser()}")
+    return os.path.join(base, "reease")
+
+
+# Per-user directory for REEase's on-disk caches; override with REEASE_CACHE_DIR
+CACHE_DIR = os.environ.get("REEASE_CACHE_DIR") or _user_cache_dir()
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_EXTRACTION_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def private_cache_dir(*parts: str) -> str:
+    """CACHE_DIR (or a directory inside it), created with mode 0700
+    
+    Cached summaries and document text must not be readable, or plantable, by
+    other local users, so an existing CACHE_DIR owned by someone else raises
+    OSError and one with group or other permissions is tightened.
+    """
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    info = os.stat(CACHE_DIR)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise OSError(f"Cache directory {CACHE_DIR} belongs to another user")
+    if info.st_mode & 0o077:
+        os.chmod(CACHE_DIR, 0o700)
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic edits do not defeat the cache"""
+    return " ".join(text.split())
+
+
+class SummaryCache:
+    """Content-addressed summary cache with an in-memory LRU tier and a SQLite tier
+    
+    Keys are hashes of the normalized input text, prompt template, compression
+    ratio and model name. Both tiers honour a TTL; the memory tier is bounded by
+    entry count and the disk tier by entry count and total stored bytes.
+    """
+    
+    def __init__(self, max_memory_entries: int = 256, disk_path: Optional[str] = None,
+                 max_disk_entries: int = 10000, max_disk_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        
+        self._lock = threading.Lock()
+        # key -> (summary, expires_at, latency, tokens)
+        self._memory: "OrderedDict[str, Tuple[str, float, float, int]]" = OrderedDict()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_seconds": 0.0,
+            "saved_tokens": 0,
+        }
+        
+        self.disk_path = disk_path
+        self._db = None
+        if disk_path:
+            try:
+                self._db = self._open_db(disk_path)
+            except sqlite3.Error as e:
+                logging.error(f"Summary cache disk tier disabled: {e}")
+                self._db = None
+    
+    @staticmethod
+    def _open_db(path: str) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " latency REAL NOT NULL DEFAULT 0,"
+            " tokens INTEGER NOT NULL DEFAULT 0)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at)")
+        return db
+    
+    @staticmethod
+    def make_key(text: str, prompt_template: str, compression_ratio: Optional[str], model: str) -> str:
+        """Build the content-addressed key for a summarization request"""
+        payload = json.dumps(
+            [model, prompt_template, compression_ratio, normalize_text(text)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _record_hit(self, tier: str, latency: float, tokens: int) -> None:
+        metrics.CACHE_REQUESTS.inc(cache="summary", result=f"{tier}_hit")
+        self._counters[f"{tier}_hits"] += 1
+        self._counters["saved_seconds"] += latency
+        self._counters["saved_tokens"] += tokens
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached summary for ``key`` or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, latency, tokens = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._record_hit("memory", latency, tokens)
+                    return value
+                del self._memory[key]
+            
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created_at, latency, tokens FROM summaries WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created_at, latency, tokens = row
+                        if created_at + self.ttl_seconds > now:
+                            self._db.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+                            self._remember(key, value, created_at + self.ttl_seconds, latency, tokens)
+                            self._record_hit("disk", latency, tokens)
+                            return value
+                        self._db.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                except sqlite3.Error as e:
+                    logging.error(f"Summary cache read failed: {e}")
+            
+            self._counters["misses"] += 1
+            metrics.CACHE_REQUESTS.inc(cache="summary", result="miss")
+            return None
+    
+    def set(self, key: str, value: str, latency: float = 0.0, tokens: int = 0) -> None:
+        """Store a summary along with the model latency and tokens it cost to produce"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now + self.ttl_seconds, latency, tokens)
+            self._counters["stores"] += 1
+            
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO summaries (key, value, created_at, accessed_at, size, latency, tokens)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, value, now, now, len(value.encode("utf-8")), latency, tokens)
+                    )
+                    self._prune_disk(now)
+                except sqlite3.Error as e:
+                    logging.error(f"Summary cache write failed: {e}")
+    
+    def _remember(self, key: str, value: str, expires_at: float, latency: float, tokens: int) -> None:
+        self._memory[key] = (value, expires_at, latency, tokens)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+    
+    def _prune_disk(self, now: float) -> None:
+        expired = self._db.execute(
+            "DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        self._counters["evictions"] += max(expired, 0)
+        
+        count, total_bytes = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+        if count <= self.max_disk_entries and total_bytes <= self.max_disk_bytes:
+            return
+        
+        # Evict least recently used rows until both bounds hold again
+        for key, size in self._db.execute("SELECT key, size FROM summaries ORDER BY accessed_at").fetchall():
+            if count <= self.max_disk_entries and total_bytes <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            count -= 1
+            total_bytes -= size
+            self._counters["evictions"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the model time and tokens the cache has saved"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self) -> None:
+        """Drop every cached summary from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM summaries")
+
+
+_default_cache: Optional[SummaryCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> SummaryCache:
+    """Process-wide cache shared by every TextSummarizer (and Streamlit rerun)"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = float(os.environ.get("REEASE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+            try:
+                disk_path = os.path.join(private_cache_dir(), "summaries.sqlite3")
+            except OSError as e:
+                logging.error(f"Summary cache disk tier disabled: {e}")
+                disk_path = None
+            _default_cache = SummaryCache(disk_path=disk_path, ttl_seconds=ttl)
+        return _default_cache
+
+
+class ExtractionCache:
+    """On-disk cache of extracted document text keyed by file content hash
+    
+    Each entry is one zlib-compressed file named after the hash of the file's
+    bytes and the extractor name and version, so changing either misses. Reads
+    decompress straight from a memory map; writes go through a temp file and an
+    atomic rename, so several processes can share the directory. Once the
+    compressed entries exceed ``max_bytes`` the least recently read are removed.
+    """
+    
+    SUFFIX = ".txt.z"
+    
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_EXTRACTION_CACHE_BYTES,
+                 compression_level: int = 6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        except OSError as e:
+            logging.error(f"Extraction cache directory unavailable: {e}")
+        
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+    
+    @staticmethod
+    def file_digest(file_obj: BinaryIO) -> str:
+        """sha256 of a seekable binary file; the read position is restored afterwards"""
+        start = file_obj.tell()
+        file_obj.seek(0)
+        digest = hashlib.sha256()
+        for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+            digest.update(block)
+        file_obj.seek(start)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def make_key(content_digest: str, extractor_name: str, extractor_version: str) -> str:
+        payload = json.dumps([content_digest, extractor_name, extractor_version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+    
+    def _count(self, result: str) -> None:
+        metrics.CACHE_REQUESTS.inc(cache="extraction", result=result)
+        with self._lock:
+            self._counters["hits" if result == "hit" else "misses"] += 1
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for ``key`` or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                text = zlib.decompress(mapped).decode("utf-8")
+            # The modification time doubles as the last-read time for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self._count("miss")
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logging.error(f"Extraction cache entry {key} unreadable, discarding it: {e}")
+            self._discard(path)
+            self._count("miss")
+            return None
+        self._count("hit")
+        return text
+    
+    def set(self, key: str, text: str) -> None:
+        """Store extracted text, then evict old entries beyond ``max_bytes``"""
+        data = zlib.compress(text.encode("utf-8"), self.compression_level)
+        if len(data) > self.max_bytes:
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logging.error(f"Extraction cache write failed: {e}")
+            if tmp_path is not None:
+                self._discard(tmp_path)
+            return
+        with self._lock:
+            self._counters["stores"] += 1
+        self._prune()
+    
+    def _discard(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    
+    def _entries(self) -> Iterator[Tuple[str, int, float]]:
+        if not os.path.isdir(self.directory):
+            return
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+    
+    def _prune(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self._discard(path)
+            total_bytes -= size
+            with self._lock:
+                self._counters["evictions"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the number and compressed size of stored entries"""
+        with self._lock:
+            stats = dict(self._counters)
+        entries = list(self._entries())
+        stats["entries"] = len(entries)
+        stats["disk_bytes"] = sum(size for _, size, _ in entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self) -> None:
+        """Remove every cached extraction"""
+        for path, _, _ in list(self._entries()):
+            self._discard(path)
+
+
+_default_extraction_cache: Optional[ExtractionCache] = None
+
+
+def get_default_extraction_cache() -> ExtractionCache:
+    """Process-wide extraction cache in CACHE_DIR, bounded by REEASE_EXTRACT_CACHE_BYTES"""
+    global _default_extraction_cache
+    with _default_cache_lock:
+        if _default_extraction_cache is None:
+            max_bytes = int(os.environ.get("REEASE_EXTRACT_CACHE_BYTES", DEFAULT_EXTRACTION_CACHE_BYTES))
+            try:
+                directory = private_cache_dir("extracted")
+            except OSError as e:
+                # Keep caching, but only for this process, in a fresh private directory
+                logging.error(f"Extraction cache falling back to a temporary directory: {e}")
+                directory = tempfile.mkdtemp(prefix="reease-extracted-")
+            _default_extraction_cache = ExtractionCache(directory, max_bytes=max_bytes)
+        return _default_extraction_cache
@@ -0,0 +1,60 @@
+import re
+from typing import Iterator, List
+
+from tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Extractors separate pages with a form feed so chunking can respect them
+PAGE_BREAK = "\f"
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_oversized(text: str, max_tokens: int) -> Iterator[str]:
+    """Break a paragraph that exceeds the budget on sentences, then on raw length"""
+    for sentence in _SENTENCE_SPLIT.split(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            yield sentence
+            continue
+        step = max_tokens * CHARS_PER_TOKEN
+        for start in range(0, len(sentence), step):
+            yield sentence[start:start + step]
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """Split text into chunks of at most ``max_tokens`` estimated tokens
+    
+    Chunks are packed greedily from paragraphs. A page break closes the current
+    chunk once it is at least half full, so chunks tend to align with pages;
+    paragraphs that are too large on their own are split on sentences.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    
+    def flush() -> None:
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current = []
+        current_tokens = 0
+    
+    for page in text.split(PAGE_BREAK):
+        if current_tokens >= max_tokens // 2:
+            flush()
+        
+        for paragraph in _PARAGRAPH_SPLIT.split(page):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            
+            pieces = [paragraph] if estimate_tokens(paragraph) <= max_tokens else _split_oversized(paragraph, max_tokens)
+            for piece in pieces:
+                piece_tokens = estimate_tokens(piece)
+                if current and current_tokens + piece_tokens > max_tokens:
+                    flush()
+                current.append(piece)
+                current_tokens += piece_tokens
+    
+    flush()
+    return chunks
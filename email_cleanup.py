@@ -0,0 +1,155 @@
+"""Remove repeated text from email threads before they are summarized.
+
+Reply chains usually carry the whole quoted history in every message, so the
+joined thread grows quadratically with its length. ``clean_thread`` drops
+quoted blocks, signatures and messages that are near-duplicates of an earlier
+message in the same thread, and reports how many tokens that saved. Forwarded
+messages are usually new to the thread, so they are kept unless they repeat an
+earlier message.
+
+Near-duplicates are found with MinHash signatures over word shingles. Messages
+are bucketed with locality-sensitive hashing (LSH) bands so each message is
+only compared against likely matches instead of every earlier message.
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tokens import estimate_tokens
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+DUPLICATE_THRESHOLD = 0.8
+
+# Headers that introduce the quoted original below a reply
+_REPLY_HEADER_RE = re.compile(
+    r"^\s*(?:"
+    r"On\s.{1,200}?\swrote:"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r")\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+# Headers that introduce a forwarded message (or a bare header block of one)
+_FORWARD_HEADER_RE = re.compile(
+    r"^\s*(?:-{2,}\s*Forwarded Message\s*-{2,}|Begin forwarded message:)\s*$"
+    r"|^(?=\s*From:\s.+\n\s*(?:Sent|Date):\s)",
+    re.IGNORECASE | re.MULTILINE
+)
+# The From/Date/Subject lines at the top of a forwarded message
+_HEADER_BLOCK_RE = re.compile(r"\A(?:[ \t]*(?:From|To|Cc|Date|Sent|Subject):.*(?:\n|\Z))+", re.IGNORECASE)
+_QUOTED_LINE_RE = re.compile(r"^\s*>")
+_SIGNATURE_RE = re.compile(
+    r"^(?:-- ?|__+|Sent from my \w+.*|Get Outlook for \w+.*)$",
+    re.IGNORECASE | re.MULTILINE
+)
+_WORD_RE = re.compile(r"\w+")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_random = np.random.RandomState(1)
+_HASH_A = _random.randint(1, 1 << 31, NUM_PERMUTATIONS).astype(np.uint64)
+_HASH_B = _random.randint(0, 1 << 31, NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def strip_quoted(body: str) -> str:
+    """Drop the quoted original below a reply header and any ``>``-quoted lines"""
+    header = _REPLY_HEADER_RE.search(body)
+    if header:
+        body = body[:header.start()]
+    lines = [line for line in body.splitlines() if not _QUOTED_LINE_RE.match(line)]
+    return "\n".join(lines).strip()
+
+
+def split_forwarded(body: str) -> Tuple[str, str]:
+    """Split a message into its own text and the forwarded message below it (if any)"""
+    header = _FORWARD_HEADER_RE.search(body)
+    if not header:
+        return body, ""
+    return body[:header.start()].strip(), body[header.end():].strip()
+
+
+def strip_signature(body: str) -> str:
+    """Drop everything from the signature delimiter (``-- ``, "Sent from my ...") on"""
+    signature = _SIGNATURE_RE.search(body)
+    if signature:
+        body = body[:signature.start()]
+    return body.strip()
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """MinHash signature of the text's word shingles (``None`` if it has no words)"""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    size = min(SHINGLE_WORDS, len(words))
+    shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    # Universal hashing (a * x + b) mod p, one row per permutation; the products
+    # stay below 2**63 because a, b < 2**31 and x < 2**32
+    permuted = (np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+
+def find_near_duplicates(bodies: Sequence[str], threshold: float = DUPLICATE_THRESHOLD) -> List[bool]:
+    """Flag every body whose estimated Jaccard similarity to an earlier one reaches ``threshold``"""
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    signatures: List[Optional[np.ndarray]] = []
+    duplicates: List[bool] = []
+    
+    for index, body in enumerate(bodies):
+        signature = minhash(body)
+        signatures.append(signature)
+        if signature is None:
+            duplicates.append(False)
+            continue
+        
+        bands = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(LSH_BANDS)]
+        candidates = {candidate for band in bands for candidate in buckets.get(band, ())}
+        duplicate = any(
+            np.mean(signatures[candidate] == signature) >= threshold
+            for candidate in sorted(candidates)
+        )
+        duplicates.append(duplicate)
+        # Only originals are indexed, so a chain of small edits cannot drift far from them
+        if not duplicate:
+            for band in bands:
+                buckets.setdefault(band, []).append(index)
+    return duplicates
+
+
+def clean_thread(bodies: Sequence[str]) -> Tuple[List[str], Dict[str, int]]:
+    """Strip quotes, signatures and near-duplicate messages from one thread
+    
+    A forwarded message is checked for duplicates separately from the text
+    above it, so it is only dropped when an earlier message already has it.
+    Returns the remaining bodies in their original order and stats with the
+    estimated ``tokens_saved``. If cleaning would leave nothing, the original
+    bodies are kept.
+    """
+    segments = [
+        strip_signature(segment)
+        for body in bodies
+        for segment in split_forwarded(strip_quoted(body))
+    ]
+    # Compare forwarded messages by their text, not by the headers they were forwarded with
+    duplicates = find_near_duplicates([_HEADER_BLOCK_RE.sub("", segment) for segment in segments])
+    kept = ["" if duplicate else segment for segment, duplicate in zip(segments, duplicates)]
+    # Rejoin each message's own text with whatever survived of its forwarded part
+    cleaned = [body for body in ("\n\n".join(filter(None, pair)) for pair in zip(kept[::2], kept[1::2])) if body]
+    if not cleaned:
+        cleaned = [body for body in bodies if body.strip()]
+    
+    original_tokens = estimate_tokens(" ".join(bodies).strip())
+    cleaned_tokens = estimate_tokens(" ".join(cleaned).strip())
+    return cleaned, {
+        "messages": len(bodies),
+        "messages_kept": len(cleaned),
+        "duplicates_removed": sum(duplicates),
+        "original_tokens": original_tokens,
+        "cleaned_tokens": cleaned_tokens,
+        "tokens_saved": original_tokens - cleaned_tokens,
+    }
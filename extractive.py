@@ -0,0 +1,171 @@
+"""Local extractive pre-compression of long documents.
+
+Before a long document is sent to the model, ``compress_text`` can keep only
+its most representative sentences, up to a token budget, in their original
+order. Sentences are scored with NumPy over a sparse TF-IDF representation
+(stored as coordinate arrays), either by cosine similarity to the document
+centroid (``tfidf``) or by TextRank centrality over the sentence similarity
+graph (``textrank``).
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from tokens import estimate_tokens
+
+METHODS = ("tfidf", "textrank")
+
+# Sentences with no terminal punctuation (tables, bullet runs) are cut into
+# pieces of at most this many words so the budget can be filled finely
+MAX_SENTENCE_WORDS = 60
+# Fragments shorter than this (page headers, slide numbers) and repeated
+# sentences are only kept if the budget has room left over
+MIN_SENTENCE_WORDS = 5
+# TextRank builds a dense sentence x sentence matrix; beyond this many sentences
+# the centroid score is used instead
+MAX_TEXTRANK_SENTENCES = 4000
+# Vocabulary cap for the dense matrix TextRank multiplies (most frequent terms)
+MAX_TEXTRANK_TERMS = 4096
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_TOLERANCE = 1e-6
+TEXTRANK_MAX_ITERATIONS = 100
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\f")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+def split_sentences(text: str) -> Tuple[List[str], List[int]]:
+    """Split text into sentences, returning them with the index of their paragraph"""
+    sentences: List[str] = []
+    paragraphs: List[int] = []
+    for paragraph_index, paragraph in enumerate(_PARAGRAPH_RE.split(text)):
+        paragraph = " ".join(paragraph.split())
+        for sentence in _SENTENCE_END_RE.split(paragraph):
+            words = sentence.split()
+            for start in range(0, len(words), MAX_SENTENCE_WORDS):
+                sentences.append(" ".join(words[start:start + MAX_SENTENCE_WORDS]))
+                paragraphs.append(paragraph_index)
+    return sentences, paragraphs
+
+
+def _term_weights(sentences: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """L2-normalized sublinear TF-IDF weights as ``(rows, cols, weights, vocabulary size)``"""
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    for index, sentence in enumerate(sentences):
+        for word in _WORD_RE.findall(sentence.lower()):
+            if len(word) > 1 and word not in STOPWORDS:
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
+                rows.append(index)
+    
+    n_terms = max(len(vocabulary), 1)
+    keys, counts = np.unique(np.array(rows, dtype=np.int64) * n_terms + np.array(cols, dtype=np.int64),
+                             return_counts=True)
+    rows_array, cols_array = keys // n_terms, keys % n_terms
+    
+    document_frequency = np.bincount(cols_array, minlength=n_terms)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    weights = (1 + np.log(counts)) * idf[cols_array]
+    norms = np.sqrt(np.bincount(rows_array, weights=weights * weights, minlength=len(sentences)))
+    weights /= norms[rows_array]
+    return rows_array, cols_array, weights, n_terms
+
+
+def _centroid_scores(rows: np.ndarray, cols: np.ndarray, weights: np.ndarray, n_sentences: int,
+                     n_terms: int) -> np.ndarray:
+    centroid = np.bincount(cols, weights=weights, minlength=n_terms)
+    return np.bincount(rows, weights=weights * centroid[cols], minlength=n_sentences)
+
+
+def _textrank_scores(rows: np.ndarray, cols: np.ndarray, weights: np.ndarray, n_sentences: int,
+                     n_terms: int) -> np.ndarray:
+    # Keep the most widespread terms so the dense matrix stays small
+    document_frequency = np.bincount(cols, minlength=n_terms)
+    kept_terms = np.argsort(-document_frequency, kind="stable")[:MAX_TEXTRANK_TERMS]
+    column_of = np.full(n_terms, -1, dtype=np.int64)
+    column_of[kept_terms] = np.arange(len(kept_terms))
+    mask = column_of[cols] >= 0
+    
+    matrix = np.zeros((n_sentences, len(kept_terms)), dtype=np.float32)
+    matrix[rows[mask], column_of[cols[mask]]] = weights[mask]
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    
+    # Row-normalize into transition probabilities; isolated sentences jump uniformly
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / n_sentences),
+                           where=out_weight > 0)
+    scores = np.full(n_sentences, 1.0 / n_sentences, dtype=np.float32)
+    for _ in range(TEXTRANK_MAX_ITERATIONS):
+        updated = (1 - TEXTRANK_DAMPING) / n_sentences + TEXTRANK_DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TEXTRANK_TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def score_sentences(sentences: List[str], method: str = "tfidf") -> np.ndarray:
+    """Importance score for every sentence (higher is more representative)"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown extractive method {method!r}; use one of {', '.join(METHODS)}")
+    if not sentences:
+        return np.zeros(0)
+    rows, cols, weights, n_terms = _term_weights(sentences)
+    if method == "textrank":
+        if len(sentences) <= MAX_TEXTRANK_SENTENCES:
+            return _textrank_scores(rows, cols, weights, len(sentences), n_terms)
+        logging.info(f"{len(sentences)} sentences is too many for TextRank; using TF-IDF centroid scores")
+    return _centroid_scores(rows, cols, weights, len(sentences), n_terms)
+
+
+def compress_text(text: str, budget_tokens: int, method: str = "tfidf") -> Tuple[str, Dict[str, Any]]:
+    """Keep the highest-scoring sentences that fit in ``budget_tokens``, in document order
+    
+    Sentences from the same paragraph are rejoined with spaces and paragraphs
+    with blank lines, so later chunking still sees paragraph boundaries.
+    """
+    started = time.perf_counter()
+    sentences, paragraphs = split_sentences(text)
+    scores = score_sentences(sentences, method)
+    seen = set()
+    for index, sentence in enumerate(sentences):
+        if len(sentence.split()) < MIN_SENTENCE_WORDS or sentence in seen:
+            scores[index] = -1.0
+        seen.add(sentence)
+    
+    # Take sentences best-first while the running token total fits the budget
+    order = np.argsort(-scores, kind="stable")
+    lengths = np.array([estimate_tokens(sentence) for sentence in sentences], dtype=np.int64)
+    fits = np.cumsum(lengths[order]) <= budget_tokens
+    kept = np.sort(order[:max(1, int(fits.sum()))]) if sentences else order
+    
+    pieces: List[str] = []
+    previous_paragraph = None
+    for index in kept:
+        if previous_paragraph is not None:
+            pieces.append(" " if paragraphs[index] == previous_paragraph else "\n\n")
+        pieces.append(sentences[index])
+        previous_paragraph = paragraphs[index]
+    compressed = "".join(pieces)
+    
+    return compressed, {
+        "method": method,
+        "sentences": len(sentences),
+        "kept_sentences": len(kept),
+        "input_tokens": estimate_tokens(text),
+        "output_tokens": estimate_tokens(compressed),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
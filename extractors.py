@@ -0,0 +1,284 @@
+"""Pluggable text extractors, looked up by file extension or sniffed content type.
+
+Backends are registered as ``"module:function"`` targets and imported only the
+first time a matching file is extracted, so importing this module (and app.py)
+does not pay for PyPDF2 or textract up front. DOCX and PPTX files are streamed
+out of their zip containers by the ooxml module rather than python-docx and
+python-pptx.
+
+Third-party packages can add formats by calling ``register_extractor`` or by
+exposing a ``reease.extractors`` entry point whose target is a zero-argument
+callable that performs the registration.
+"""
+import importlib
+import importlib.util
+import io
+import logging
+import mimetypes
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Union
+
+import metrics
+from cache import ExtractionCache, get_default_extraction_cache
+
+ENTRY_POINT_GROUP = "reease.extractors"
+SNIFF_BYTES = 2048
+
+ExtractFunc = Callable[[BinaryIO], str]
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when no registered extractor can handle a file"""
+
+
+class Extractor:
+    """A registered extraction backend, resolved lazily on first use"""
+    
+    def __init__(self, name: str, target: Union[str, ExtractFunc], extensions: Iterable[str] = (),
+                 mime_types: Iterable[str] = (), version: str = "1"):
+        self.name = name
+        self.target = target
+        self.extensions = tuple(ext.lower().lstrip(".") for ext in extensions)
+        self.mime_types = tuple(mime_types)
+        self.version = version
+        self._func: Optional[ExtractFunc] = None if isinstance(target, str) else target
+    
+    def load(self) -> ExtractFunc:
+        """Import the backend (once) and return its extract function"""
+        if self._func is None:
+            module_name, _, attr = self.target.partition(":")
+            self._func = getattr(importlib.import_module(module_name), attr)
+        return self._func
+    
+    def __call__(self, file_obj: BinaryIO) -> str:
+        return self.load()(file_obj)
+    
+    def __repr__(self) -> str:
+        return f"Extractor({self.name!r}, extensions={self.extensions}, version={self.version!r})"
+
+
+_lock = threading.Lock()
+_by_extension: Dict[str, Extractor] = {}
+_by_mime_type: Dict[str, Extractor] = {}
+_fallback: Optional[Extractor] = None
+_plugins_loaded = False
+
+
+def register_extractor(name: str, target: Optional[Union[str, ExtractFunc]] = None,
+                       extensions: Iterable[str] = (), mime_types: Iterable[str] = (),
+                       version: str = "1"):
+    """Register an extractor for the given extensions and MIME types
+    
+    ``target`` is either a callable taking a binary file object or a lazy
+    ``"module:function"`` reference. Without a target this returns a decorator.
+    Later registrations override earlier ones for the same key.
+    """
+    if target is None:
+        def decorator(func: ExtractFunc) -> ExtractFunc:
+            register_extractor(name, func, extensions, mime_types, version)
+            return func
+        return decorator
+    
+    extractor = Extractor(name, target, extensions, mime_types, version)
+    with _lock:
+        for ext in extractor.extensions:
+            _by_extension[ext] = extractor
+        for mime_type in extractor.mime_types:
+            _by_mime_type[mime_type] = extractor
+    return extractor
+
+
+def set_fallback_extractor(target: Optional[Union[str, ExtractFunc]], name: str = "fallback",
+                           version: str = "1") -> None:
+    """Set the extractor used for files no other backend claims (None disables it)"""
+    global _fallback
+    with _lock:
+        _fallback = Extractor(name, target, version=version) if target is not None else None
+
+
+def supported_extensions() -> List[str]:
+    """Extensions with a dedicated extractor"""
+    _load_plugins()
+    with _lock:
+        return sorted(_by_extension)
+
+
+def _load_plugins() -> None:
+    """Run ``reease.extractors`` entry points once, on first lookup"""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            entry_point.load()()
+        except Exception as e:
+            logging.error(f"Failed to load extractor plugin {entry_point.name}: {e}")
+
+
+def _file_extension(filename: str) -> str:
+    _, ext = os.path.splitext(filename or "")
+    return ext.lower().lstrip(".")
+
+
+def sniff_mime_type(file_obj: BinaryIO, filename: str = "") -> Optional[str]:
+    """Guess a MIME type from the leading bytes of a file, falling back to its name"""
+    if not file_obj.seekable():
+        return mimetypes.guess_type(filename or "")[0]
+    
+    position = file_obj.tell()
+    head = file_obj.read(SNIFF_BYTES)
+    file_obj.seek(position)
+    
+    if head.startswith(b"%PDF"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        # OOXML documents are zip files; the part names tell them apart
+        try:
+            with zipfile.ZipFile(file_obj) as archive:
+                names = archive.namelist()
+        except zipfile.BadZipFile:
+            names = []
+        finally:
+            file_obj.seek(position)
+        if any(name.startswith("word/") for name in names):
+            return "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        if any(name.startswith("ppt/") for name in names):
+            return "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+        return "application/zip"
+    if head.startswith(b"{\\rtf"):
+        return "application/rtf"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "application/x-ole-storage"
+    if head and b"\x00" not in head:
+        # A multi-byte character may be cut at the sniff boundary
+        sample = head[:-3] if len(head) == SNIFF_BYTES else head
+        try:
+            sample.decode("utf-8")
+            return "text/plain"
+        except UnicodeDecodeError:
+            pass
+    
+    guessed, _ = mimetypes.guess_type(filename or "")
+    return guessed
+
+
+def get_extractor(filename: str, file_obj: Optional[BinaryIO] = None) -> Extractor:
+    """Find the extractor for a file by extension, then by sniffed content type"""
+    _load_plugins()
+    ext = _file_extension(filename)
+    
+    with _lock:
+        extractor = _by_extension.get(ext)
+    if extractor is not None:
+        return extractor
+    
+    if file_obj is not None:
+        mime_type = sniff_mime_type(file_obj, filename)
+        with _lock:
+            extractor = _by_mime_type.get(mime_type)
+        if extractor is not None:
+            return extractor
+    
+    with _lock:
+        fallback = _fallback
+    if fallback is not None:
+        return fallback
+    
+    label = ext.upper() or "Unknown"
+    raise UnsupportedFormatError(
+        f"File format {label} not supported. Please use PDF, DOCX, TXT, PPTX, or JSON files."
+    )
+
+
+def extract_text(file_obj: BinaryIO, filename: Optional[str] = None,
+                 cache: Union[ExtractionCache, None, bool] = True) -> str:
+    """Extract text from a binary file object using the matching registered backend
+    
+    Results are cached by file content hash and extractor version, so the same
+    document is only parsed once. ``cache`` may be an ExtractionCache, ``True``
+    for the process-wide default, or ``False``/``None`` to always parse.
+    """
+    filename = filename or getattr(file_obj, "name", "") or ""
+    extractor = get_extractor(filename, file_obj)
+    if cache is True:
+        cache = get_default_extraction_cache()
+    
+    cache_key = None
+    if cache and file_obj.seekable():
+        digest = ExtractionCache.file_digest(file_obj)
+        cache_key = ExtractionCache.make_key(digest, extractor.name, extractor.version)
+        text = cache.get(cache_key)
+        if text is not None:
+            return text
+    
+    with metrics.span("extract"):
+        text = extractor(file_obj).strip()
+    metrics.CHARACTERS.inc(len(text), operation="extract", direction="output")
+    if cache_key is not None:
+        cache.set(cache_key, text)
+    return text
+
+
+def extract_bytes(data: bytes, filename: str) -> str:
+    """Extract the text of an in-memory file (a picklable task for ``file_process_pool``)"""
+    return extract_text(io.BytesIO(data), filename)
+
+
+def _init_file_worker() -> None:
+    # Files are already spread across processes; keep PDF extraction single-process
+    os.environ["REEASE_PDF_WORKERS"] = "1"
+
+
+def file_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """A process pool whose workers each extract whole files
+    
+    Workers are spawned rather than forked, since forking a process that
+    already runs threads (Streamlit's, the service's or the metrics server's)
+    can deadlock the child, and they never start PDF page pools of their own.
+    """
+    return ProcessPoolExecutor(max_workers=max(1, max_workers), mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_file_worker)
+
+
+# Built-in backends. Heavy libraries are imported inside each function.
+
+def _extract_txt(file_obj: BinaryIO) -> str:
+    return file_obj.read().decode("utf-8")
+
+
+def _extract_with_textract(file_obj: BinaryIO) -> str:
+    import textract
+    
+    # textract works on paths, so spool the upload to a file with its extension
+    suffix = os.path.splitext(getattr(file_obj, "name", "") or "")[1]
+    with tempfile.NamedTemporaryFile(prefix="reease-", suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(file_obj, tmp)
+    try:
+        return textract.process(tmp.name).decode("utf-8")
+    finally:
+        os.unlink(tmp.name)
+
+
+register_extractor("pdf", "pdf_extractor:extract_pdf_text", ["pdf"], ["application/pdf"])
+# Version 2 streams the OOXML parts and adds tables, text boxes, footnotes and speaker notes
+register_extractor(
+    "docx", "ooxml:extract_docx", ["docx"],
+    ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"], version="2"
+)
+register_extractor(
+    "pptx", "ooxml:extract_pptx", ["pptx"],
+    ["application/vnd.openxmlformats-officedocument.presentationml.presentation"], version="2"
+)
+register_extractor("txt", _extract_txt, ["txt"], ["text/plain"])
+
+# textract covers everything else when it is installed; find_spec does not import it
+if importlib.util.find_spec("textract") is not None:
+    set_fallback_extractor(_extract_with_textract, name="textract")
@@ -0,0 +1,166 @@
+"""Offline stand-in for the Gemini client, for benchmarks and local testing.
+
+``FakeGeminiClient`` implements the subset of ``genai.Client`` that
+TextSummarizer uses (``models.generate_content``, ``generate_content_stream``,
+``models.get`` and ``close``). Latency, token throughput and error rate are
+configurable, and replies are deterministic extracts of the prompt sized like
+a real summary, so every code path can run on a machine with no network.
+"""
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from google.genai import errors, types
+
+from tokens import CHARS_PER_TOKEN, estimate_tokens
+
+_PERCENT_RE = re.compile(r"(\d+)% of its original length")
+_WORDS_RE = re.compile(r"(\d+) words")
+# Matches summarizer.WORDS_PER_TOKEN, so "N words" and "P% of its length" replies are sized alike
+_WORDS_PER_TOKEN = 0.75
+_THREAD_RE = re.compile(r'<thread id=("(?:[^"\\]|\\.)*")>\n(.*?)\n</thread>', re.S)
+
+
+class FakeModels:
+    """The ``client.models`` surface of the fake client"""
+    
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+    
+    def generate_content(self, model: str, contents: str, config: Any = None) -> types.GenerateContentResponse:
+        text = self._client._reply(contents, config)
+        self._client._sleep(self._client._first_token_seconds(contents) + self._client._transfer_seconds(text))
+        return self._client._response(contents, text)
+    
+    def generate_content_stream(self, model: str, contents: str, config: Any = None) -> Iterator[types.GenerateContentResponse]:
+        text = self._client._reply(contents)
+        self._client._sleep(self._client._first_token_seconds(contents))
+        words = text.split(" ")
+        for start in range(0, len(words), self._client.stream_chunk_words):
+            piece = " ".join(words[start:start + self._client.stream_chunk_words])
+            if start:
+                piece = " " + piece
+            self._client._sleep(self._client._transfer_seconds(piece))
+            yield self._client._response(contents, piece)
+    
+    def get(self, model: str, config: Any = None) -> Dict[str, str]:
+        return {"name": model}
+
+
+class FakeGeminiClient:
+    """Configurable fake model backend
+    
+    ``latency`` is the time to first token in seconds, ``tokens_per_second`` the
+    output throughput after that, and ``error_rate`` the probability that a
+    request fails with a 503 ``ServerError`` like an overloaded endpoint (with a
+    RetryInfo delay of ``retry_after`` seconds when set). A ``straggler_rate``
+    fraction of requests take ``straggler_latency`` seconds to first token, to
+    model tail latency. With ``prefill_tokens_per_second`` set, the time to first
+    token also grows with the prompt length.
+    """
+    
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 200.0, error_rate: float = 0.0,
+                 default_output_tokens: int = 120, seed: Optional[int] = None, stream_chunk_words: int = 8,
+                 retry_after: Optional[float] = None, straggler_rate: float = 0.0, straggler_latency: float = 2.0,
+                 prefill_tokens_per_second: float = 0.0):
+        self.latency = latency
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.retry_after = retry_after
+        self.straggler_rate = straggler_rate
+        self.straggler_latency = straggler_latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.default_output_tokens = default_output_tokens
+        self.stream_chunk_words = stream_chunk_words
+        self.models = FakeModels(self)
+        
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+    
+    def close(self) -> None:
+        pass
+    
+    def _sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+    
+    def _first_token_seconds(self, prompt: str) -> float:
+        with self._lock:
+            straggler = self.straggler_rate and self._random.random() < self.straggler_rate
+        prefill = estimate_tokens(prompt) / self.prefill_tokens_per_second if self.prefill_tokens_per_second else 0.0
+        return (self.straggler_latency if straggler else self.latency) + prefill
+    
+    def _transfer_seconds(self, text: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return estimate_tokens(text) / self.tokens_per_second
+    
+    def _target_tokens(self, prompt: str, source: str) -> int:
+        words = _WORDS_RE.search(prompt)
+        if words:
+            return int(int(words.group(1)) / _WORDS_PER_TOKEN)
+        percent = _PERCENT_RE.search(prompt)
+        if percent:
+            return max(1, estimate_tokens(source) * int(percent.group(1)) // 100)
+        return self.default_output_tokens
+    
+    def _reply(self, prompt: str, config: Any = None) -> str:
+        """Pick the reply for a prompt (or raise the configured random failure)"""
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+            failed = self.error_rate and self._random.random() < self.error_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            error = {"code": 503, "message": "Fake model overloaded", "status": "UNAVAILABLE"}
+            if self.retry_after is not None:
+                error["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{self.retry_after}s"}]
+            raise errors.ServerError(503, {"error": error})
+        
+        if getattr(config, "response_mime_type", None) == "application/json":
+            # Packed threads: a JSON object with one extract per <thread id=...> block
+            text = json.dumps({
+                json.loads(thread_id): self._extract(prompt, body)
+                for thread_id, body in _THREAD_RE.findall(prompt)
+            })
+        else:
+            # Reply with the leading words of the source text (after the instructions)
+            _, _, source = prompt.partition("\n\n")
+            text = self._extract(prompt, source or prompt)
+        with self._lock:
+            self.output_tokens += estimate_tokens(text)
+        return text
+    
+    def _extract(self, prompt: str, source: str) -> str:
+        text = " ".join(source.split())
+        limit = self._target_tokens(prompt, source) * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        # Cut at a word boundary, but always keep at least one word
+        return text[:limit].rsplit(" ", 1)[0] or text.split(" ", 1)[0]
+    
+    def _response(self, prompt: str, text: str) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=estimate_tokens(prompt),
+                candidates_token_count=estimate_tokens(text)
+            )
+        )
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+            }
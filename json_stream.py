@@ -0,0 +1,220 @@
+"""Incremental ingestion of email-thread exports.
+
+``iter_json_records`` parses a JSON array or JSON Lines stream one record at a
+time, and ``group_threads`` groups message bodies by ``thread_id`` within a
+memory budget, spilling to a temporary SQLite database when the budget is
+exceeded. Together they keep memory bounded however large the export is.
+"""
+import codecs
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_GROUP_MEMORY_BYTES = 64 * 1024 * 1024
+SPILL_BATCH_SIZE = 1000
+NUMBER_LOOKAHEAD = 64
+
+_WHITESPACE = " \t\r\n"
+
+
+class _Reader:
+    """Decoded text buffer over a binary stream that is refilled on demand"""
+    
+    def __init__(self, stream: BinaryIO, chunk_size: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+    
+    def fill(self, size: int = 0) -> bool:
+        """Append another chunk (of ``size`` bytes if given) to the buffer; returns False at end of stream"""
+        if self.eof:
+            return False
+        data = self._stream.read(size or self._chunk_size)
+        if not data:
+            self.eof = True
+            self.buffer += self._decoder.decode(b"", final=True)
+            return False
+        # Drop consumed text so the buffer only ever holds the current record
+        self.buffer = self.buffer[self.pos:] + self._decoder.decode(data)
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of stream), without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+    
+    def decode_value(self, decoder: json.JSONDecoder) -> Any:
+        """Decode the next JSON value, reading more input while it is incomplete
+        
+        A syntax error away from the end of the buffer is raised at once rather
+        than reading the rest of the stream. Reads grow geometrically while one
+        value spans many chunks, so re-parsing it stays linear in its size.
+        """
+        self.peek()
+        read_size = self._chunk_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # An unterminated string reports where it starts, everything else where parsing stopped
+                truncated = e.pos >= len(self.buffer) - NUMBER_LOOKAHEAD or e.msg.startswith("Unterminated string")
+                if truncated and self.fill(read_size):
+                    read_size *= 2
+                    continue
+                raise
+            # A number near the end of the buffer (e.g. "4." of "4.5e3") may
+            # continue in the next chunk, so make sure some lookahead is loaded
+            if len(self.buffer) - end < NUMBER_LOOKAHEAD and not self.eof and self.fill(read_size):
+                read_size *= 2
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_records(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield records from a JSON array or a JSON Lines / concatenated JSON stream
+    
+    Only the record currently being parsed is held in memory. Malformed input
+    raises ``json.JSONDecodeError``.
+    """
+    reader = _Reader(stream, chunk_size)
+    decoder = json.JSONDecoder()
+    
+    if reader.peek() != "[":
+        # JSON Lines (or a single top-level object)
+        while reader.peek():
+            yield reader.decode_value(decoder)
+        return
+    
+    reader.pos += 1
+    if reader.peek() == "]":
+        reader.pos += 1
+    else:
+        while True:
+            yield reader.decode_value(decoder)
+            separator = reader.peek()
+            reader.pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", reader.buffer, reader.pos - 1)
+    
+    if reader.peek():
+        raise json.JSONDecodeError("Extra data", reader.buffer, reader.pos)
+
+
+class _SpilledGroups:
+    """SQLite-backed thread groups used once the in-memory budget is exceeded"""
+    
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="reease-threads-", suffix=".sqlite3")
+        os.close(fd)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE threads (key TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+        self.db.execute("CREATE TABLE messages (key TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL)")
+        self._batch: List[Tuple[str, int, str]] = []
+    
+    def add(self, key: str, seq: int, body: str) -> None:
+        self._batch.append((key, seq, body))
+        if len(self._batch) >= SPILL_BATCH_SIZE:
+            self.flush()
+    
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        self.db.executemany("INSERT OR IGNORE INTO threads (key, seq) VALUES (?, ?)",
+                            ((key, seq) for key, seq, _ in self._batch))
+        self.db.executemany("INSERT INTO messages (key, seq, body) VALUES (?, ?, ?)", self._batch)
+        self._batch = []
+    
+    def iter_groups(self) -> Iterator[Tuple[str, List[str]]]:
+        self.flush()
+        self.db.execute("CREATE INDEX messages_key ON messages (key, seq)")
+        for (key,) in self.db.execute("SELECT key FROM threads ORDER BY seq").fetchall():
+            bodies = [body for (body,) in self.db.execute(
+                "SELECT body FROM messages WHERE key = ? ORDER BY seq", (key,)
+            )]
+            yield key, bodies
+    
+    def close(self) -> None:
+        self.db.close()
+        os.unlink(self.path)
+
+
+def _thread_key(thread_id: Any) -> str:
+    # JSON keeps 1 and "1" apart, like the dict grouping it replaces
+    return json.dumps(thread_id)
+
+
+def group_threads(records: Iterable[Any], max_memory_bytes: int = DEFAULT_GROUP_MEMORY_BYTES,
+                  contiguous: bool = False) -> Iterator[Tuple[Any, List[str]]]:
+    """Group message bodies by thread_id, yielding ``(thread_id, bodies)`` per thread
+    
+    Threads come out in order of first appearance. Messages without a thread_id
+    are skipped. Once the buffered bodies exceed ``max_memory_bytes`` all groups
+    move to a temporary SQLite file. With ``contiguous=True`` (input sorted by
+    thread) each group is yielded as soon as the next thread starts, so nothing
+    beyond the current thread is buffered.
+    """
+    groups: Dict[str, List[str]] = {}
+    buffered_bytes = 0
+    spilled = None
+    current_key = None
+    
+    try:
+        for seq, item in enumerate(records):
+            if not isinstance(item, dict):
+                raise ValueError("JSON file should contain a list of email messages")
+            
+            thread_id = item.get("thread_id")
+            if thread_id is None:
+                continue
+            body = item.get("body", "") or ""
+            key = _thread_key(thread_id)
+            
+            if contiguous:
+                if key != current_key and current_key is not None:
+                    yield json.loads(current_key), groups.pop(current_key)
+                current_key = key
+                groups.setdefault(key, []).append(body)
+                continue
+            
+            if spilled is not None:
+                spilled.add(key, seq, body)
+                continue
+            
+            groups.setdefault(key, []).append(body)
+            buffered_bytes += len(body)
+            if buffered_bytes > max_memory_bytes:
+                spilled = _SpilledGroups()
+                # Negative sequence numbers keep buffered messages ahead of later ones
+                spill_seq = -sum(len(bodies) for bodies in groups.values())
+                for spill_key, bodies in groups.items():
+                    for spill_body in bodies:
+                        spilled.add(spill_key, spill_seq, spill_body)
+                        spill_seq += 1
+                groups = {}
+        
+        if spilled is not None:
+            for key, bodies in spilled.iter_groups():
+                yield json.loads(key), bodies
+        else:
+            for key, bodies in groups.items():
+                yield json.loads(key), bodies
+    finally:
+        if spilled is not None:
+            spilled.close()
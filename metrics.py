@@ -0,0 +1,267 @@
+"""In-process metrics with Prometheus text exposition.
+
+A deliberately small registry (counters, gauges, histograms with labels) so
+the hot paths can be instrumented without a new dependency. Set
+REEASE_METRICS=0 to turn recording into a no-op, and REEASE_METRICS_PORT to
+have the app serve ``/metrics`` for Prometheus to scrape.
+"""
+import bisect
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+ENABLED = os.environ.get("REEASE_METRICS", "1") != "0"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+    
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every label combination"""
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. requests currently in flight"""
+    kind = "gauge"
+    
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels: str) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+    
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "reease_stage_seconds", "Wall time spent in each processing stage", ["stage"]
+))
+MODEL_REQUESTS = REGISTRY.register(Counter(
+    "reease_model_requests_total", "Model requests by call kind and outcome", ["kind", "outcome"]
+))
+MODEL_INFLIGHT = REGISTRY.register(Gauge(
+    "reease_model_inflight_requests", "Model requests currently in flight"
+))
+MODEL_FIRST_TOKEN_SECONDS = REGISTRY.register(Histogram(
+    "reease_model_first_token_seconds", "Time to the first streamed chunk of a model reply"
+))
+MODEL_RETRIES = REGISTRY.register(Counter(
+    "reease_model_retries_total", "Model requests retried after a failure", ["reason"]
+))
+MODEL_CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    "reease_model_circuit_open", "1 while the model circuit breaker is failing calls fast"
+))
+TOKENS = REGISTRY.register(Counter(
+    "reease_model_tokens_total", "Model tokens by direction (input/output)", ["direction"]
+))
+CHARACTERS = REGISTRY.register(Counter(
+    "reease_characters_total", "Characters processed by operation and direction", ["operation", "direction"]
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "reease_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+))
+
+PACKED_THREADS = REGISTRY.register(Counter(
+    "reease_packed_threads_total", "Threads sent in packed requests, by whether the reply covered them", ["outcome"]
+))
+
+THREAD_TOKENS_SAVED = REGISTRY.register(Counter(
+    "reease_thread_tokens_saved_total", "Estimated prompt tokens removed from email threads before summarization"
+))
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block of work into ``reease_stage_seconds{stage=...}``"""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def record_usage(response, prompt_tokens: int) -> None:
+    """Count input/output tokens, preferring the model's own usage metadata"""
+    if not ENABLED or response is None:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(usage, "prompt_token_count", None) or prompt_tokens
+    output_tokens = getattr(usage, "candidates_token_count", None) or 0
+    TOKENS.inc(input_tokens, direction="input")
+    TOKENS.inc(output_tokens, direction="output")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="reease-metrics", daemon=True).start()
+    return server
+
+
+def metrics_port() -> Optional[int]:
+    port = os.environ.get("REEASE_METRICS_PORT")
+    return int(port) if port else None
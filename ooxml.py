@@ -0,0 +1,229 @@
+"""Streaming text extraction for Word (DOCX) and PowerPoint (PPTX) files.
+
+Instead of building python-docx / python-pptx object models, the XML parts
+are read straight out of the OOXML zip with ``ElementTree.iterparse`` and
+text is emitted as each paragraph, table row or shape closes, so memory
+stays bounded by the largest paragraph rather than the whole document.
+
+Text comes out in reading order:
+
+- DOCX: body paragraphs and tables interleaved as they appear in the
+  document (one line per table row, cells separated by " | "), text boxes
+  after their anchoring paragraph's text, then footnotes and endnotes
+- PPTX: slides in presentation order (shapes and tables in the slide's own
+  order) separated by page breaks, each followed by its speaker notes
+
+Elements are matched by local name, so Transitional and Strict OOXML
+namespaces both work. Deleted revisions and field codes are skipped, as are
+``mc:Fallback`` copies of content that ``mc:Choice`` already provides.
+"""
+import posixpath
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from chunking import PAGE_BREAK
+
+TABLE_CELL_SEPARATOR = " | "
+NOTES_PREFIX = "Speaker notes: "
+SLIDE_SEPARATOR = "\n" + PAGE_BREAK
+# Placeholders on notes pages that repeat the slide number, date, header or footer
+NOTES_SKIPPED_PLACEHOLDERS = frozenset({"sldNum", "dt", "hdr", "ftr", "sldImg"})
+
+_RELATIONSHIP_SUFFIXES = {
+    "document": "/officeDocument",
+    "footnotes": "/footnotes",
+    "endnotes": "/endnotes",
+    "slide": "/slide",
+    "notes": "/notesSlide",
+}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _relationship_id(element: ElementTree.Element) -> Optional[str]:
+    """The namespaced ``r:id`` attribute (``sldId`` also has a plain numeric ``id``)"""
+    for key, value in element.attrib.items():
+        if key.startswith("{") and _local_name(key) == "id":
+            return value
+    return None
+
+
+class _Frame:
+    """An open element that collects the text of its children"""
+    
+    __slots__ = ("kind", "parts", "skip")
+    
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.parts: List[str] = []
+        self.skip = False
+
+
+def iter_part_text(source: BinaryIO, skipped_placeholders: frozenset = frozenset()) -> Iterator[str]:
+    """Yield the text of one WordprocessingML or DrawingML part, a block at a time
+    
+    A block is a top-level paragraph, a table or (DrawingML) a shape.
+    Shapes whose placeholder type is in ``skipped_placeholders`` are dropped.
+    """
+    frames: List[_Frame] = []
+    elements: List[ElementTree.Element] = []
+    fallback_depth = 0
+    output: List[str] = []
+    
+    def deliver(text: str, strip: bool = True) -> None:
+        if not text.strip():
+            return
+        if not frames:
+            output.append(text.strip() if strip else text)
+            return
+        parent = frames[-1]
+        # A text box or table inside a paragraph follows the paragraph's own text
+        parent.parts.append("\n" + text if parent.kind == "p" else text)
+    
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        name = _local_name(element.tag)
+        if name == "Fallback":
+            fallback_depth += 1 if event == "start" else -1
+            continue
+        if fallback_depth:
+            if event == "end":
+                element.clear()
+            continue
+        
+        if event == "start":
+            elements.append(element)
+            if name in ("p", "tbl", "tr", "tc", "sp"):
+                frames.append(_Frame(name))
+            elif name == "ph" and element.get("type") in skipped_placeholders:
+                for frame in reversed(frames):
+                    if frame.kind == "sp":
+                        frame.skip = True
+                        break
+            continue
+        
+        elements.pop()
+        top = frames[-1] if frames else None
+        # Tab stops in paragraph properties share the name of tabs inside runs
+        parent = _local_name(elements[-1].tag) if elements else ""
+        if name == "t" and top is not None and top.kind == "p":
+            top.parts.append(element.text or "")
+        elif name == "tab" and parent == "r" and top is not None and top.kind == "p":
+            top.parts.append("\t")
+        elif name in ("br", "cr") and parent in ("r", "p") and top is not None and top.kind == "p":
+            top.parts.append("\n")
+        elif top is not None and name == top.kind:
+            frames.pop()
+            if name == "p":
+                deliver("".join(top.parts))
+            elif name == "tc":
+                cell = " ".join(part.strip() for part in top.parts if part.strip())
+                if frames and frames[-1].kind == "tr":
+                    # Empty cells still hold their column
+                    frames[-1].parts.append(cell)
+                else:
+                    deliver(cell)
+            elif name == "tr":
+                if any(top.parts):
+                    deliver(TABLE_CELL_SEPARATOR.join(top.parts))
+            elif name == "tbl":
+                # Rows may start or end with empty cells, so keep their separators
+                deliver("\n".join(top.parts), strip=False)
+            elif not top.skip:
+                deliver("\n".join(top.parts))
+        
+        # Outside any open block nothing below the current element is needed again
+        if not frames and elements:
+            del elements[-1][:]
+        
+        if output:
+            yield from output
+            output.clear()
+
+
+class _Package:
+    """Relationship lookups over an OOXML zip archive"""
+    
+    def __init__(self, archive: zipfile.ZipFile):
+        self.archive = archive
+        self.names = set(archive.namelist())
+    
+    def relationships(self, part: Optional[str]) -> List[Dict[str, str]]:
+        """Relationships of ``part`` (None for the package itself), with resolved part names"""
+        directory, filename = posixpath.split(part or "")
+        rels_name = posixpath.join(directory, "_rels", f"{filename}.rels")
+        if rels_name not in self.names:
+            return []
+        with self.archive.open(rels_name) as fh:
+            root = ElementTree.parse(fh).getroot()
+        relationships = []
+        for rel in root:
+            target = rel.get("Target", "")
+            if rel.get("TargetMode") == "External" or not target:
+                continue
+            resolved = target.lstrip("/") if target.startswith("/") else posixpath.join(directory, target)
+            relationships.append({
+                "id": rel.get("Id", ""),
+                "type": rel.get("Type", ""),
+                "part": posixpath.normpath(resolved),
+            })
+        return relationships
+    
+    def related(self, part: Optional[str], kind: str) -> List[str]:
+        suffix = _RELATIONSHIP_SUFFIXES[kind]
+        return [rel["part"] for rel in self.relationships(part)
+                if rel["type"].endswith(suffix) and rel["part"] in self.names]
+    
+    def main_part(self, default: str) -> str:
+        parts = self.related(None, "document")
+        return parts[0] if parts else default
+    
+    def iter_text(self, part: str, skipped_placeholders: frozenset = frozenset()) -> Iterator[str]:
+        with self.archive.open(part) as fh:
+            yield from iter_part_text(fh, skipped_placeholders)
+
+
+def iter_docx_text(file_obj: BinaryIO) -> Iterator[str]:
+    """Yield the paragraphs and table rows of a Word document, then its footnotes and endnotes"""
+    with zipfile.ZipFile(file_obj) as archive:
+        package = _Package(archive)
+        document = package.main_part("word/document.xml")
+        yield from package.iter_text(document)
+        for kind in ("footnotes", "endnotes"):
+            for part in package.related(document, kind):
+                yield from package.iter_text(part)
+
+
+def iter_pptx_slides(file_obj: BinaryIO) -> Iterator[str]:
+    """Yield the text of each slide in presentation order, followed by its speaker notes"""
+    with zipfile.ZipFile(file_obj) as archive:
+        package = _Package(archive)
+        presentation = package.main_part("ppt/presentation.xml")
+        slide_parts = {rel["id"]: rel["part"] for rel in package.relationships(presentation)
+                       if rel["type"].endswith(_RELATIONSHIP_SUFFIXES["slide"])}
+        
+        with archive.open(presentation) as fh:
+            order = [_relationship_id(element) for _, element in ElementTree.iterparse(fh)
+                     if _local_name(element.tag) == "sldId"]
+        
+        for relationship_id in order:
+            slide = slide_parts.get(relationship_id)
+            if slide is None or slide not in package.names:
+                continue
+            blocks = list(package.iter_text(slide))
+            for notes in package.related(slide, "notes"):
+                notes_text = " ".join(package.iter_text(notes, NOTES_SKIPPED_PLACEHOLDERS))
+                if notes_text:
+                    blocks.append(NOTES_PREFIX + notes_text)
+            if blocks:
+                yield "\n".join(blocks)
+
+
+def extract_docx(file_obj: BinaryIO) -> str:
+    return "\n".join(iter_docx_text(file_obj))
+
+
+def extract_pptx(file_obj: BinaryIO) -> str:
+    return SLIDE_SEPARATOR.join(iter_pptx_slides(file_obj))
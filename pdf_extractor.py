@@ -0,0 +1,106 @@
+import io
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+import PyPDF2
+
+from chunking import PAGE_BREAK
+
+# Below this many pages the process pool start-up costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 32
+PAGES_PER_TASK = 8
+COPY_BUFFER_SIZE = 1024 * 1024
+PAGE_SEPARATOR = "\n" + PAGE_BREAK
+
+PdfSource = Union[str, os.PathLike, BinaryIO]
+
+
+def default_workers() -> int:
+    """Worker processes for page extraction; REEASE_PDF_WORKERS overrides the CPU count"""
+    configured = os.environ.get("REEASE_PDF_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def _spooled_path(source: PdfSource) -> Iterator[str]:
+    """Yield a filesystem path for ``source``, copying uploads to a temp file in chunks"""
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    
+    if source.seekable():
+        source.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="reease-", suffix=".pdf", delete=False) as tmp:
+        shutil.copyfileobj(source, tmp, COPY_BUFFER_SIZE)
+    try:
+        yield tmp.name
+    finally:
+        os.unlink(tmp.name)
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[BinaryIO]:
+    """Memory-map a file read-only so pages are paged in by the OS on demand"""
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            yield io.BytesIO(b"")
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Process-pool task: extract the text of pages ``start``..``stop`` of a PDF"""
+    with _mapped(path) as stream:
+        reader = PyPDF2.PdfReader(stream)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(source: PdfSource, workers: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page of a PDF, in order
+    
+    Uploads are spooled to a temporary file and memory-mapped rather than held
+    in memory. Documents with at least PARALLEL_PAGE_THRESHOLD pages are
+    extracted by a process pool, with a bounded number of page batches in
+    flight so memory stays flat regardless of page count.
+    """
+    workers = workers or default_workers()
+    
+    with _spooled_path(source) as path:
+        with _mapped(path) as stream:
+            reader = PyPDF2.PdfReader(stream)
+            page_count = len(reader.pages)
+            
+            if page_count < PARALLEL_PAGE_THRESHOLD or workers <= 1:
+                for page in reader.pages:
+                    yield page.extract_text() or ""
+                return
+        
+        ranges = [(start, min(start + PAGES_PER_TASK, page_count))
+                  for start in range(0, page_count, PAGES_PER_TASK)]
+        workers = min(workers, len(ranges))
+        
+        # Spawn rather than fork: the Streamlit server is multi-threaded
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            pending = deque()
+            for start, stop in ranges:
+                pending.append(executor.submit(_extract_page_range, path, start, stop))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+
+def extract_pdf_text(source: PdfSource, workers: Optional[int] = None) -> str:
+    """Extract the text of a PDF, joining non-empty pages in a single pass"""
+    return PAGE_SEPARATOR.join(text for text in iter_pdf_pages(source, workers) if text)
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+WINDOW_SECONDS = 60.0
+
+
+class RateLimiter:
+    """Thread-safe sliding-window limiter for requests and tokens per minute"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._tokens_in_window = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+
+    def _expire(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of the given token size fits in the current window"""
+        if not self.enabled:
+            return
+
+        # A single request larger than the whole budget may still go through
+        # once the window is empty, otherwise it would wait forever.
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+
+                fits_requests = not self.requests_per_minute or len(self._events) < self.requests_per_minute
+                fits_tokens = not self.tokens_per_minute or self._tokens_in_window + tokens <= self.tokens_per_minute
+
+                if fits_requests and fits_tokens:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+
+                wait = WINDOW_SECONDS - (now - self._events[0][0]) if self._events else 0.0
+
+            time.sleep(max(wait, 0.01))
@@ -0,0 +1,299 @@
+"""Retries, deadlines, circuit breaking and hedging for model calls.
+
+``ResilientCaller.call`` runs one logical model request as a sequence of
+attempts. Transient failures (429, 5xx, timeouts, dropped connections) are
+retried with exponential backoff and full jitter, waiting at least as long as
+the server's Retry-After hint, until the per-call deadline runs out. After
+repeated transient failures the circuit breaker opens and calls fail fast
+until a cool-down has passed. With hedging enabled, a duplicate attempt is
+started when the first one runs past the recent p95 latency and whichever
+finishes first wins.
+
+Every failure surfaces as a ``SummarizationError`` subclass, so callers never
+have to tell error text apart from a summary.
+"""
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Optional, Tuple, TypeVar
+
+import httpx
+from google.genai import errors
+
+import metrics
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+_RETRY_DELAY_RE = re.compile(r"^\s*([\d.]+)s\s*$")
+
+
+class SummarizationError(Exception):
+    """Base class for every failure to produce a summary"""
+
+
+class ModelRequestError(SummarizationError):
+    """The model rejected the request (e.g. invalid argument or permission denied); retrying will not help"""
+    
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class ModelUnavailableError(SummarizationError):
+    """The model kept failing transiently (rate limited, overloaded or unreachable)"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ModelUnavailableError):
+    """Calls are failing fast because recent calls kept failing"""
+
+
+class DeadlineExceededError(ModelUnavailableError):
+    """The per-call deadline passed before any attempt succeeded"""
+
+
+class EmptyResponseError(SummarizationError):
+    """The model answered without any text"""
+
+
+def _retry_after(exc: errors.APIError) -> Optional[float]:
+    """Seconds the server asked us to wait, from the Retry-After header or a RetryInfo detail"""
+    headers = getattr(exc.response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+    details = exc.details.get("error", {}).get("details", []) if isinstance(exc.details, dict) else []
+    for detail in details if isinstance(details, list) else []:
+        match = _RETRY_DELAY_RE.match(str(detail.get("retryDelay", ""))) if isinstance(detail, dict) else None
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def classify(exc: BaseException) -> Tuple[bool, str, Optional[int], Optional[float]]:
+    """Return ``(retryable, reason, status, retry_after)`` for an attempt's exception"""
+    if isinstance(exc, errors.APIError):
+        retryable = exc.code in RETRYABLE_STATUS_CODES
+        return retryable, str(exc.code), exc.code, _retry_after(exc) if retryable else None
+    if isinstance(exc, httpx.TimeoutException):
+        return True, "timeout", None, None
+    if isinstance(exc, (httpx.TransportError, ConnectionError)):
+        return True, "transport", None, None
+    return False, type(exc).__name__, None, None
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive transient failures
+    
+    While open every call fails fast. After ``reset_seconds`` one trial call is
+    let through (half-open); its success closes the circuit and its failure
+    opens it again.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+    
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go ahead now; True if it is the half-open trial"""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining <= 0 and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        raise CircuitOpenError("Model calls are failing; not retrying for now", retry_after=max(remaining, 0.0))
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        metrics.MODEL_CIRCUIT_OPEN.set(0)
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    logging.warning(f"Opening model circuit breaker after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                metrics.MODEL_CIRCUIT_OPEN.set(1)
+    
+    def release_trial(self) -> None:
+        """Let another trial through if the current one ended without a verdict"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies, for picking the hedging delay"""
+    
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=window)
+    
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, fraction: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ResilientCaller:
+    """Runs model attempts with retries, a deadline, a circuit breaker and optional hedging
+    
+    ``attempt`` callables receive the seconds left before the deadline (or None),
+    so they can bound their own HTTP timeout.
+    """
+    
+    def __init__(self, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 20.0,
+                 deadline: Optional[float] = 120.0, hedge: bool = False, hedge_percentile: float = 0.95,
+                 breaker: Optional[CircuitBreaker] = None, seed: Optional[int] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._random = random.Random(seed)
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+    
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's hint"""
+        delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+        return max(delay, retry_after or 0.0)
+    
+    def call(self, attempt: Callable[[Optional[float]], T], deadline: Optional[float] = None,
+             hedge: Optional[bool] = None) -> T:
+        """Run ``attempt`` until it succeeds, fails permanently, or retries/deadline run out"""
+        hedge = self.hedge if hedge is None else hedge
+        budget = self.deadline if deadline is None else deadline
+        expires_at = time.monotonic() + budget if budget else None
+        retry = 0
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                if hedge:
+                    result = self._hedged(attempt, expires_at)
+                else:
+                    result = self._timed(attempt, expires_at)
+            except DeadlineExceededError:
+                self.breaker.record_failure()
+                raise
+            except SummarizationError:
+                raise
+            except Exception as e:
+                retryable, reason, status, retry_after = classify(e)
+                if not retryable:
+                    # The model answered, so this says nothing about its availability
+                    self.breaker.record_success()
+                    if status is not None:
+                        raise ModelRequestError(f"Model rejected the request: {e}", status) from e
+                    raise SummarizationError(f"Model call failed: {e}") from e
+                
+                self.breaker.record_failure()
+                delay = self.backoff(retry, retry_after)
+                remaining = expires_at - time.monotonic() if expires_at is not None else None
+                if retry >= self.max_retries:
+                    raise ModelUnavailableError(f"Model unavailable after {retry + 1} attempts: {e}",
+                                                status, retry_after) from e
+                if remaining is not None and delay >= remaining:
+                    raise DeadlineExceededError(f"Deadline reached after {retry + 1} attempts: {e}",
+                                                status, retry_after) from e
+                
+                metrics.MODEL_RETRIES.inc(reason=reason)
+                logging.warning(f"Model call failed ({reason}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+                retry += 1
+                continue
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                # A trial that ended without a verdict must not block every later call
+                if trial:
+                    self.breaker.release_trial()
+    
+    def _timed(self, attempt: Callable[[Optional[float]], T], expires_at: Optional[float]) -> T:
+        remaining = expires_at - time.monotonic() if expires_at is not None else None
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError("Deadline reached before the request could be sent")
+        started = time.monotonic()
+        result = attempt(remaining)
+        self.latency.observe(time.monotonic() - started)
+        return result
+    
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="reease-hedge")
+            return self._hedge_executor
+    
+    def _hedged(self, attempt: Callable[[Optional[float]], T], expires_at: Optional[float]) -> T:
+        """Start a duplicate attempt if the first one outlives the recent p95 latency
+        
+        The slower attempt is abandoned rather than cancelled (a blocking HTTP
+        request cannot be interrupted); its own timeout bounds how long it runs.
+        """
+        executor = self._executor()
+        attempts = [executor.submit(self._timed, attempt, expires_at)]
+        hedge_after = self.latency.percentile(self.hedge_percentile)
+        if hedge_after is not None:
+            done, _ = wait(attempts, timeout=self._remaining(expires_at, hedge_after))
+            if not done and self._remaining(expires_at) != 0:
+                metrics.MODEL_RETRIES.inc(reason="hedge")
+                attempts.append(executor.submit(self._timed, attempt, expires_at))
+        
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=self._remaining(expires_at), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceededError("Deadline reached while waiting for the model")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+        raise error
+    
+    @staticmethod
+    def _remaining(expires_at: Optional[float], cap: Optional[float] = None) -> Optional[float]:
+        if expires_at is None:
+            return cap
+        remaining = max(0.0, expires_at - time.monotonic())
+        return remaining if cap is None else min(cap, remaining)
@@ -0,0 +1,529 @@
+"""Asynchronous HTTP API for summarization and text extraction.
+
+Built on asyncio streams from the standard library. Model calls and parsing
+are blocking, so they run on a thread pool while the event loop keeps
+accepting connections. Small inputs are answered synchronously (200); large
+documents and mailboxes, or any request with ``?async=true``, become
+background jobs (202) that clients poll at ``/v1/jobs/<id>``.
+
+Endpoints:
+
+    GET  /health                         liveness, queue depth and model health
+    GET  /metrics                        Prometheus metrics
+    POST /v1/summarize                   JSON {"text": ..., "compression": "25%"}
+    POST /v1/extract?filename=a.pdf      raw file bytes -> extracted text
+    POST /v1/summarize-file?filename=a.pdf&compression=50%
+                                         raw file bytes -> extracted text summary
+    POST /v1/threads?pack=true           JSON array / JSON Lines mailbox -> thread summaries
+                                         (add &sorted=true when messages are grouped by
+                                         thread to summarize without buffering the mailbox)
+    GET  /v1/jobs/<id>                   job status, progress and result
+
+A full job queue answers 503 and a client already using its concurrency
+limit answers 429, both with Retry-After. Clients are identified by the
+X-Client-Id header, falling back to the peer address.
+
+Run against the real model, or against the offline fake for local testing:
+
+    python service.py --port 8600
+    python service.py --port 8600 --fake-model
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from dotenv import load_dotenv
+
+import metrics
+from extractors import UnsupportedFormatError, extract_bytes, file_process_pool
+from json_stream import group_threads, iter_json_records
+from resilience import ModelRequestError, ModelUnavailableError, SummarizationError
+from tokens import estimate_tokens
+
+COMPRESSION_CHOICES = ("25%", "50%", "75%")
+
+DEFAULT_SYNC_MAX_BYTES = 1024 * 1024
+DEFAULT_SYNC_MAX_TOKENS = 24000
+DEFAULT_MAX_BODY_BYTES = 64 * 1024 * 1024
+KEEPALIVE_TIMEOUT = 15
+JOB_TTL_SECONDS = 3600
+RETRY_AFTER_SECONDS = 5
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 415: "Unsupported Media Type",
+    422: "Unprocessable Entity", 429: "Too Many Requests", 500: "Internal Server Error",
+    502: "Bad Gateway", 503: "Service Unavailable",
+}
+
+Response = Tuple[int, Any, Dict[str, str]]
+
+
+class HTTPError(Exception):
+    """An error response with a status code and optional extra headers"""
+    
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def summarization_http_error(error: SummarizationError) -> HTTPError:
+    """Map a model failure to a response: 503 if it may pass, 422 if the input was refused, else 502"""
+    if isinstance(error, ModelUnavailableError):
+        retry_after = max(1, round(error.retry_after or RETRY_AFTER_SECONDS))
+        return HTTPError(503, str(error), {"Retry-After": str(retry_after)})
+    if isinstance(error, ModelRequestError):
+        return HTTPError(422, str(error))
+    return HTTPError(502, str(error))
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes, client: str):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = dict(parse_qsl(parts.query))
+        self.headers = headers
+        self.body = body
+        self.client = client
+    
+    def flag(self, name: str) -> Optional[bool]:
+        value = self.query.get(name)
+        if value is None:
+            return None
+        return value.lower() in ("1", "true", "yes")
+    
+    def json(self) -> Any:
+        try:
+            return json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+
+
+class Job:
+    """A queued unit of background work and its outcome"""
+    
+    def __init__(self, kind: str, client: str, work: Callable[["Job"], Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.client = client
+        self.work = work
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.error_type: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        job = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            job["result"] = self.result
+        elif self.status == "failed":
+            job["error"] = self.error
+            job["error_type"] = self.error_type
+        return job
+
+
+class SummaryService:
+    """HTTP front end for one shared TextSummarizer
+    
+    ``workers`` background jobs run at once and up to ``max_queue`` more wait
+    for a worker. Each client may have ``per_client_limit`` synchronous requests
+    and unfinished jobs at a time. Inputs up to ``sync_max_bytes`` (files and
+    mailboxes) or ``sync_max_tokens`` (text) are answered synchronously.
+    Files are parsed on one shared pool of ``extract_workers`` processes, so
+    concurrent uploads cannot each start a PDF page pool of their own.
+    """
+    
+    def __init__(self, summarizer, workers: int = 4, max_queue: int = 64, per_client_limit: int = 4,
+                 sync_max_bytes: int = DEFAULT_SYNC_MAX_BYTES, sync_max_tokens: int = DEFAULT_SYNC_MAX_TOKENS,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, sync_workers: int = 8,
+                 extract_workers: Optional[int] = None, job_ttl_seconds: float = JOB_TTL_SECONDS):
+        self.summarizer = summarizer
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_client_limit = per_client_limit
+        self.sync_max_bytes = sync_max_bytes
+        self.sync_max_tokens = sync_max_tokens
+        self.max_body_bytes = max_body_bytes
+        self.job_ttl_seconds = job_ttl_seconds
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        
+        self.extract_pool = file_process_pool(self.extract_workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers + sync_workers, thread_name_prefix="reease-service")
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, int] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+        self._routes: Dict[Tuple[str, str], Callable[[Request], Awaitable[Response]]] = {
+            ("GET", "/health"): self._health,
+            ("GET", "/metrics"): self._metrics,
+            ("POST", "/v1/summarize"): self._summarize,
+            ("POST", "/v1/extract"): self._extract,
+            ("POST", "/v1/summarize-file"): self._summarize_file,
+            ("POST", "/v1/threads"): self._threads,
+        }
+    
+    async def start(self, host: str = "127.0.0.1", port: int = 8600) -> asyncio.AbstractServer:
+        """Start the job workers and begin accepting connections"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return await asyncio.start_server(self._handle_connection, host, port)
+    
+    async def close(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.extract_pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Connection handling
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        peer_host = peer[0] if peer else "unknown"
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, {}, keep_alive=False)
+                    break
+                
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                
+                try:
+                    body = await self._read_body(reader, headers)
+                except HTTPError as e:
+                    # The unread body would be parsed as the next request, so hang up
+                    await self._respond(writer, e.status, {"error": str(e)}, e.headers, keep_alive=False)
+                    break
+                
+                client = headers.get("x-client-id") or peer_host
+                status, payload, extra_headers = await self._dispatch(Request(method, target, headers, body, client))
+                await self._respond(writer, status, payload, extra_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # Idle keep-alive, client hung up mid-request, or an oversized header line
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f"Request body exceeds {self.max_body_bytes} bytes")
+        return await reader.readexactly(length) if length > 0 else b""
+    
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any,
+                       headers: Dict[str, str], keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+    
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self._routes.get((request.method, request.path))
+        try:
+            if handler is not None:
+                return await handler(request)
+            if request.method == "GET" and request.path.startswith("/v1/jobs/"):
+                return await self._job_status(request)
+            if any(path == request.path for _, path in self._routes):
+                raise HTTPError(405, f"{request.method} not allowed on {request.path}")
+            raise HTTPError(404, f"No route for {request.path}")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}, e.headers
+        except SummarizationError as e:
+            http_error = summarization_http_error(e)
+            return http_error.status, {"error": str(e), "error_type": type(e).__name__}, http_error.headers
+        except Exception as e:
+            logging.exception(f"Request {request.method} {request.path} failed")
+            return 500, {"error": f"Internal error: {e}"}, {}
+    
+    # Scheduling
+    
+    def _acquire_slot(self, client: str) -> None:
+        if self._active.get(client, 0) >= self.per_client_limit:
+            raise HTTPError(429, f"Client already has {self.per_client_limit} requests in progress",
+                            {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        self._active[client] = self._active.get(client, 0) + 1
+    
+    def _release_slot(self, client: str) -> None:
+        remaining = self._active.get(client, 0) - 1
+        if remaining > 0:
+            self._active[client] = remaining
+        else:
+            self._active.pop(client, None)
+    
+    async def _run(self, request: Request, kind: str, work: Callable[[Job], Any], large: bool) -> Response:
+        """Answer synchronously, or queue a background job for large or ``?async=true`` requests"""
+        if large or request.flag("async"):
+            return self._enqueue(request.client, kind, work)
+        
+        self._acquire_slot(request.client)
+        try:
+            job = Job(kind, request.client, work)
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, work, job)
+        finally:
+            self._release_slot(request.client)
+        return 200, result, {}
+    
+    def _enqueue(self, client: str, kind: str, work: Callable[[Job], Any]) -> Response:
+        self._prune_jobs()
+        self._acquire_slot(client)
+        job = Job(kind, client, work)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._release_slot(client)
+            raise HTTPError(503, "Job queue is full, retry later", {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        self.jobs[job.id] = job
+        status_url = f"/v1/jobs/{job.id}"
+        return 202, {"job_id": job.id, "status": job.status, "status_url": status_url}, {"Location": status_url}
+    
+    def _prune_jobs(self) -> None:
+        """Forget finished jobs older than the TTL (jobs are stored in submission order)"""
+        cutoff = time.time() - self.job_ttl_seconds
+        for job_id, job in list(self.jobs.items()):
+            if job.created_at >= cutoff:
+                break
+            if job.finished_at is not None:
+                del self.jobs[job_id]
+    
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await loop.run_in_executor(self.executor, job.work, job)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.error_type = type(e).__name__
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._release_slot(job.client)
+                self._queue.task_done()
+    
+    # Work performed on the thread pool
+    
+    def _summarize_text(self, text: str, compression: Optional[str]) -> Dict[str, Any]:
+        summary = self.summarizer.generate_summary(text, compression)
+        return {"summary": summary, "compression": compression, "characters": len(text)}
+    
+    def _extract_bytes(self, body: bytes, filename: str) -> str:
+        pool = self.extract_pool
+        try:
+            return pool.submit(extract_bytes, body, filename).result()
+        except UnsupportedFormatError as e:
+            raise HTTPError(415, str(e))
+        except BrokenProcessPool:
+            # A worker died (e.g. on a pathological file); later requests get a fresh pool
+            if self.extract_pool is pool:
+                self.extract_pool = file_process_pool(self.extract_workers)
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise HTTPError(500, f"Extraction worker stopped unexpectedly while parsing {filename}")
+    
+    def _summarize_threads(self, body: bytes, pack: Optional[bool], contiguous: bool, job: Job) -> Dict[str, Any]:
+        threads = []
+        job.progress["threads_done"] = 0
+        groups = group_threads(iter_json_records(io.BytesIO(body)), contiguous=contiguous)
+        try:
+            for summary in self.summarizer.iter_thread_summaries(groups, pack=pack):
+                threads.append(summary)
+                job.progress["threads_done"] = len(threads)
+        except ValueError as e:
+            # Malformed JSON (JSONDecodeError) or records that are not email messages
+            raise HTTPError(400, f"Invalid mailbox: {e}")
+        return {"threads": threads}
+    
+    # Route handlers
+    
+    @staticmethod
+    def _compression(value: Any) -> Optional[str]:
+        if value in (None, "", "Regular"):
+            return None
+        if value not in COMPRESSION_CHOICES:
+            raise HTTPError(400, f"compression must be one of {', '.join(COMPRESSION_CHOICES)}")
+        return value
+    
+    @staticmethod
+    def _filename(request: Request) -> str:
+        filename = request.query.get("filename") or request.headers.get("x-filename")
+        if not filename:
+            raise HTTPError(400, "Pass the original file name as ?filename= or an X-Filename header")
+        return filename
+    
+    async def _health(self, request: Request) -> Response:
+        model_ok = await asyncio.get_running_loop().run_in_executor(self.executor, self.summarizer.check_health)
+        running = sum(1 for job in self.jobs.values() if job.status == "running")
+        return (200 if model_ok else 503), {
+            "status": "ok" if model_ok else "degraded",
+            "queued": self._queue.qsize(),
+            "running": running,
+            "queue_capacity": self.max_queue,
+        }, {}
+    
+    async def _metrics(self, request: Request) -> Response:
+        return 200, metrics.REGISTRY.render_prometheus(), {}
+    
+    async def _summarize(self, request: Request) -> Response:
+        payload = request.json()
+        if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+            raise HTTPError(400, 'Body must be a JSON object with a "text" string')
+        text = payload["text"]
+        compression = self._compression(payload.get("compression"))
+        large = estimate_tokens(text) > self.sync_max_tokens
+        return await self._run(request, "summarize", lambda job: self._summarize_text(text, compression), large)
+    
+    async def _extract(self, request: Request) -> Response:
+        filename = self._filename(request)
+        body = request.body
+        
+        def work(job: Job) -> Dict[str, Any]:
+            text = self._extract_bytes(body, filename)
+            return {"filename": filename, "text": text, "characters": len(text)}
+        return await self._run(request, "extract", work, len(body) > self.sync_max_bytes)
+    
+    async def _summarize_file(self, request: Request) -> Response:
+        filename = self._filename(request)
+        compression = self._compression(request.query.get("compression"))
+        body = request.body
+        
+        def work(job: Job) -> Dict[str, Any]:
+            job.progress["stage"] = "extract"
+            text = self._extract_bytes(body, filename)
+            if not text:
+                raise HTTPError(422, f"No text could be extracted from {filename}")
+            job.progress["stage"] = "summarize"
+            return {"filename": filename, **self._summarize_text(text, compression)}
+        return await self._run(request, "summarize-file", work, len(body) > self.sync_max_bytes)
+    
+    async def _threads(self, request: Request) -> Response:
+        body = request.body
+        pack = request.flag("pack")
+        contiguous = bool(request.flag("sorted"))
+        return await self._run(request, "threads", lambda job: self._summarize_threads(body, pack, contiguous, job),
+                               len(body) > self.sync_max_bytes)
+    
+    async def _job_status(self, request: Request) -> Response:
+        job = self.jobs.get(request.path.rsplit("/", 1)[-1])
+        if job is None:
+            raise HTTPError(404, "Unknown or expired job")
+        return 200, job.to_dict(), {}
+
+
+async def serve(service: SummaryService, host: str, port: int) -> None:
+    server = await service.start(host, port)
+    logging.info(f"REEase service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve REEase summarization over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=4, help="background jobs processed at once")
+    parser.add_argument("--queue-size", type=int, default=64, help="jobs waiting before requests get 503")
+    parser.add_argument("--per-client", type=int, default=4, help="concurrent requests and jobs per client")
+    parser.add_argument("--sync-max-bytes", type=int, default=DEFAULT_SYNC_MAX_BYTES,
+                        help="larger uploads and mailboxes become background jobs")
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="processes parsing uploaded files (default: CPU count)")
+    parser.add_argument("--rpm", type=int, default=None, help="max model requests per minute")
+    parser.add_argument("--tpm", type=int, default=None, help="max model tokens per minute")
+    parser.add_argument("--fake-model", action="store_true", help="answer with the offline fake model (no API key)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+    
+    # Imported here so --help works without the model SDK configured
+    from summarizer import TextSummarizer
+    
+    client = None
+    if args.fake_model:
+        from fake_model import FakeGeminiClient
+        client = FakeGeminiClient()
+    try:
+        summarizer = TextSummarizer(requests_per_minute=args.rpm, tokens_per_minute=args.tpm, client=client)
+    except Exception as e:
+        print(f"Failed to initialize summarizer: {e}", file=sys.stderr)
+        return 2
+    
+    service = SummaryService(summarizer, workers=args.workers, max_queue=args.queue_size,
+                             per_client_limit=args.per_client, sync_max_bytes=args.sync_max_bytes,
+                             extract_workers=args.extract_workers)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
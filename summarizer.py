@@ -1,100 +1,774 @@
 import os
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable, Deque, Iterable, Iterator, Sequence, TypeVar
+import httpx
 from google import genai
 from google.genai import types
+import metrics
+from cache import SummaryCache, get_default_cache
+from chunking import split_into_chunks
+from email_cleanup import clean_thread
+from extractive import METHODS as PRECOMPRESS_METHODS, compress_text
+from json_stream import group_threads
+from rate_limiter import RateLimiter
+from resilience import EmptyResponseError, ResilientCaller, SummarizationError
+from tokens import estimate_tokens
+
+# Prompt templates. Each template is part of the summary cache key, so editing
+# one naturally invalidates the summaries it produced.
+SUMMARY_PROMPTS = {
+    "25%": "Summarize the following text to 25% of its original length. Keep only the most essential information:\n\n{text}",
+    "50%": "Summarize the following text to 50% of its original length. Maintain key points and important details:\n\n{text}",
+    "75%": "Summarize the following text to 75% of its original length. Preserve most details while making it more concise:\n\n{text}",
+}
+DEFAULT_SUMMARY_PROMPT = "Create a clear and concise summary of the following text, maintaining all important information:\n\n{text}"
+# Map-reduce prompts used when a document does not fit in a single request
+CHUNK_PROMPT_PREFIX = "The following text is section {index} of {count} of a longer document. "
+REDUCE_PROMPT = "The following are summaries of consecutive sections of one document. Merge them into a single coherent summary of about {words} words. Keep the most important information and remove repetition:\n\n{text}"
+FINAL_MERGE_PROMPT = "The following are summaries of consecutive sections of one document. Merge them into a single clear and concise summary, maintaining all important information and removing repetition:\n\n{text}"
+# Used instead of SUMMARY_PROMPTS when only locally selected sentences are sent
+PRECOMPRESSED_PROMPT = "The following sentences were extracted from a longer document, in their original order. Using them, write a clear summary of the document of about {words} words. Keep only the most important information:\n\n{text}"
+COMPRESSION_RATIOS = {"25%": 0.25, "50%": 0.5, "75%": 0.75}
+MAX_REDUCE_LEVELS = 4
+WORDS_PER_TOKEN = 0.75
+
+# Live summarization: fold newly appended text into an existing summary
+UPDATE_SUMMARY_PROMPT = "Below is a summary of a document, followed by text that was just appended to that document. Rewrite the summary so it also covers the new text. Keep it clear and concise, maintain all important information, and reply with the updated summary only.\n\nCurrent summary:\n{summary}\n\nAppended text:\n{text}"
+
+THREAD_SUMMARY_PROMPT = "Summarize this email thread in 60 words or less. Focus on key decisions, actions, and important details. Remove formatting characters and line breaks:\n\n{text}"
+PACKED_THREADS_PROMPT = "Summarize each of the email threads below separately, in 60 words or less each. Focus on key decisions, actions, and important details. Remove formatting characters and line breaks. Reply with a JSON object mapping every thread id to its summary:\n\n{text}"
+PACKED_THREAD_OVERHEAD_TOKENS = 100
+
+# HTTP connection pool defaults; override the pool size with REEASE_HTTP_POOL_SIZE
+DEFAULT_HTTP_POOL_SIZE = 16
+KEEPALIVE_SECONDS = 120.0
+HEALTH_CHECK_INTERVAL = 300.0
+HEALTH_CHECK_TIMEOUT = 5.0
+HEALTH_CHECK_FAILURE_BACKOFF = 30.0
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 class TextSummarizer:
     """Text summarization service using Google Gemini AI"""
     
-    def __init__(self):
+    # Shared by every instance, so a replacement built after a failed check backs off too
+    _last_health_failure = 0.0
+    
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, cache: Optional[SummaryCache] = None,
+                 use_cache: bool = True, max_chunk_tokens: int = 24000, max_output_tokens: int = 8192,
+                 http_pool_size: Optional[int] = None, client: Optional[Any] = None,
+                 pack_threads: bool = False, pack_token_budget: int = 8000,
+                 pack_max_thread_tokens: int = 1000, pack_max_threads: int = 40,
+                 clean_threads: bool = True, max_retries: int = 4, call_deadline: Optional[float] = 120.0,
+                 hedge_requests: bool = False, precompress: Optional[str] = None,
+                 precompress_factor: float = 1.5, precompress_min_tokens: int = 2000):
+        # Keep-alive connection pool shared by every thread using this summarizer
+        self.http_pool_size = http_pool_size or int(os.environ.get("REEASE_HTTP_POOL_SIZE", DEFAULT_HTTP_POOL_SIZE))
+        
+        # A client may be injected (e.g. fake_model.FakeGeminiClient for offline runs)
         self.api_key = os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
+        if client is not None:
+            self.client = client
+        elif not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        self.client = genai.Client(api_key=self.api_key)
+        else:
+            self.client = self._build_client()
         self.model = "gemini-2.5-flash"
+        
+        self._health_lock = threading.Lock()
+        self._last_healthy = 0.0
+        self._closed = False
+        
+        # Concurrency and rate limiting for batch (JSON thread) summarization
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        
+        # Retries with backoff, per-call deadlines, circuit breaker and optional
+        # hedged requests for every model call
+        self.caller = ResilientCaller(max_retries=max_retries, deadline=call_deadline, hedge=hedge_requests)
+        
+        # Strip quoted history, signatures and repeated messages from email threads
+        self.clean_threads = clean_threads
+        
+        # Packing of short email threads into shared requests (JSON mode)
+        self.pack_threads = pack_threads
+        self.pack_token_budget = pack_token_budget
+        self.pack_max_thread_tokens = pack_max_thread_tokens
+        self.pack_max_threads = pack_max_threads
+        
+        # Documents larger than max_chunk_tokens go through the map-reduce pipeline;
+        # max_output_tokens caps the length a single merged summary can aim for
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_output_tokens = max_output_tokens
+        
+        # Optional local extractive stage ("tfidf" or "textrank") for documents of at
+        # least precompress_min_tokens: keep the best sentences up to
+        # precompress_factor times the requested summary length
+        self.precompress = precompress
+        self.precompress_factor = precompress_factor
+        self.precompress_min_tokens = precompress_min_tokens
+        
+        # Summary cache, shared process-wide unless a specific one is supplied
+        self.cache = (cache or get_default_cache()) if use_cache else None
+    
+    def _build_client(self) -> genai.Client:
+        limits = httpx.Limits(
+            max_connections=self.http_pool_size,
+            max_keepalive_connections=self.http_pool_size,
+            keepalive_expiry=KEEPALIVE_SECONDS
+        )
+        http_options = types.HttpOptions(
+            client_args={"limits": limits},
+            async_client_args={"limits": limits}
+        )
+        return genai.Client(api_key=self.api_key, http_options=http_options)
+    
+    def check_health(self, max_age: float = HEALTH_CHECK_INTERVAL) -> bool:
+        """Return whether the client can still reach the model API
+        
+        A successful check is trusted for ``max_age`` seconds, so callers (such as
+        Streamlit's resource cache validation on every rerun) only pay for a real
+        request occasionally. The probe gives up after HEALTH_CHECK_TIMEOUT
+        seconds, and a failure is reported again without probing for
+        HEALTH_CHECK_FAILURE_BACKOFF seconds, so an outage does not cost every
+        rerun a blocking request. A failed check only reports the failure: the
+        owner decides whether to build a new summarizer. The client is left open
+        because other callers may still be using it.
+        """
+        if self._closed:
+            return False
+        
+        with self._health_lock:
+            now = time.monotonic()
+            if now - self._last_healthy < max_age:
+                return True
+            if now - TextSummarizer._last_health_failure < HEALTH_CHECK_FAILURE_BACKOFF:
+                return False
+            config = types.GetModelConfig(
+                http_options=types.HttpOptions(timeout=int(HEALTH_CHECK_TIMEOUT * 1000))
+            )
+            try:
+                self.client.models.get(model=self.model, config=config)
+            except Exception as e:
+                TextSummarizer._last_health_failure = time.monotonic()
+                logging.error(f"Summarizer health check failed: {e}")
+                return False
+            self._last_healthy = time.monotonic()
+            return True
     
-    def generate_summary(self, text: str, compression_ratio: Optional[str] = None) -> str:
-        """Generate a summary of the provided text with optional compression ratio"""
+    def close(self) -> None:
+        """Release the HTTP connection pool"""
+        if self._closed:
+            return
+        self._closed = True
         try:
-            if not text or not text.strip():
-                return "No content to summarize."
-            
-            # Build prompt based on compression ratio
-            if compression_ratio == "25%":
-                prompt = f"Summarize the following text to 25% of its original length. Keep only the most essential information:\n\n{text}"
-            elif compression_ratio == "50%":
-                prompt = f"Summarize the following text to 50% of its original length. Maintain key points and important details:\n\n{text}"
-            elif compression_ratio == "75%":
-                prompt = f"Summarize the following text to 75% of its original length. Preserve most details while making it more concise:\n\n{text}"
+            self.client.close()
+        except Exception as e:
+            logging.error(f"Error closing summarizer client: {e}")
+    
+    def _cache_key(self, text: str, template: str, compression_ratio: Optional[str]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(text, template, compression_ratio, self.model)
+    
+    def _cache_lookup(self, cache_key: Optional[str]) -> Optional[str]:
+        if cache_key is None:
+            return None
+        return self.cache.get(cache_key)
+    
+    def _cache_store(self, cache_key: Optional[str], summary: str, prompt: str, started: float) -> None:
+        if cache_key is None:
+            return
+        latency = time.perf_counter() - started
+        self.cache.set(cache_key, summary, latency=latency,
+                       tokens=estimate_tokens(prompt) + estimate_tokens(summary))
+    
+    @staticmethod
+    def _with_timeout(config: Optional[types.GenerateContentConfig],
+                      timeout: Optional[float]) -> Optional[types.GenerateContentConfig]:
+        """Bound one attempt's HTTP timeout by the time left before the call's deadline"""
+        if timeout is None:
+            return config
+        http_options = types.HttpOptions(timeout=max(1000, int(timeout * 1000)))
+        return (config or types.GenerateContentConfig()).model_copy(update={"http_options": http_options})
+    
+    def _generate(self, prompt: str, config: Optional[types.GenerateContentConfig] = None):
+        """Send a prompt to the model, retrying transient failures within the call deadline
+        
+        Raises a SummarizationError subclass when no attempt succeeds.
+        """
+        return self.caller.call(lambda timeout: self._generate_once(prompt, config, timeout))
+    
+    def _generate_once(self, prompt: str, config: Optional[types.GenerateContentConfig],
+                       timeout: Optional[float]):
+        """A single attempt, respecting the configured rate limits"""
+        prompt_tokens = estimate_tokens(prompt)
+        self.rate_limiter.acquire(prompt_tokens)
+        with metrics.MODEL_INFLIGHT.track_inprogress(), metrics.span("model_call"):
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=prompt,
+                    config=self._with_timeout(config, timeout)
+                )
+            except Exception:
+                metrics.MODEL_REQUESTS.inc(kind="generate", outcome="error")
+                raise
+        metrics.MODEL_REQUESTS.inc(kind="generate", outcome="ok")
+        metrics.record_usage(response, prompt_tokens)
+        return response
+    
+    def _open_stream(self, prompt: str, prompt_tokens: int, timeout: Optional[float]) -> Tuple[Iterator[Any], Any]:
+        """Start a streamed reply and wait for its first chunk, so failures to connect can be retried"""
+        self.rate_limiter.acquire(prompt_tokens)
+        stream = iter(self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._with_timeout(None, timeout)
+        ))
+        return stream, next(stream, None)
+    
+    def _generate_stream(self, prompt: str) -> Iterator[Any]:
+        """Stream a prompt's response chunks from the model, respecting the rate limits
+        
+        Opening the stream is retried like any other call (never hedged); a failure
+        after the first chunk has been yielded raises SummarizationError.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        started = time.perf_counter()
+        outcome = "ok"
+        last_chunk = None
+        with metrics.MODEL_INFLIGHT.track_inprogress(), metrics.span("model_stream"):
+            try:
+                stream, chunk = self.caller.call(
+                    lambda timeout: self._open_stream(prompt, prompt_tokens, timeout), hedge=False
+                )
+                if chunk is not None:
+                    metrics.MODEL_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                while chunk is not None:
+                    last_chunk = chunk
+                    yield chunk
+                    chunk = next(stream, None)
+            except GeneratorExit:
+                outcome = "cancelled"
+                raise
+            except SummarizationError:
+                outcome = "error"
+                raise
+            except Exception as e:
+                outcome = "error"
+                raise SummarizationError(f"Model stream interrupted: {e}") from e
+            finally:
+                metrics.MODEL_REQUESTS.inc(kind="stream", outcome=outcome)
+        # The final chunk carries the usage totals for the whole reply
+        metrics.record_usage(last_chunk, prompt_tokens)
+    
+    def _generate_text(self, prompt: str) -> str:
+        """Generate text for an intermediate pipeline step; empty replies are errors"""
+        response = self._generate(prompt)
+        if not response or not response.text:
+            raise EmptyResponseError("Model returned an empty response")
+        return response.text.strip()
+    
+    def _run_parallel(self, func: Callable[[T], R], items: Sequence[T],
+                      max_workers: Optional[int] = None) -> List[R]:
+        """Apply ``func`` to ``items`` on a bounded worker pool, preserving order"""
+        if not items:
+            return []
+        workers = min(max_workers or self.max_concurrency, len(items))
+        if workers == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reease-worker") as executor:
+            return list(executor.map(func, items))
+    
+    @staticmethod
+    def _record_stage(stats: Dict[str, Any], stage: str, started: float, **details: Any) -> None:
+        seconds = time.perf_counter() - started
+        stats["stages"].append({"stage": stage, "seconds": round(seconds, 3), **details})
+        metrics.STAGE_SECONDS.observe(seconds, stage=f"mapreduce_{stage.split('_')[0]}")
+    
+    def _finish_pipeline(self, stats: Dict[str, Any]) -> None:
+        stats["total_seconds"] = round(sum(stage["seconds"] for stage in stats["stages"]), 3)
+        logging.info(
+            "Map-reduce summary: "
+            + ", ".join(f"{stage['stage']}={stage['seconds']}s" for stage in stats["stages"])
+            + f" ({stats['chunks']} chunks, {stats['reduce_levels']} reduce levels)"
+        )
+    
+    def _map_reduce_stages(self, text: str, compression_ratio: Optional[str],
+                           target_tokens: Optional[int] = None) -> Tuple[str, Optional[str], Dict[str, Any]]:
+        """Run the chunk, map and reduce stages of the map-reduce pipeline
+        
+        Chunks are summarized in parallel at the requested ratio. While the joined
+        partial summaries still exceed the chunk budget they are regrouped and merged
+        again (at most MAX_REDUCE_LEVELS times). ``target_tokens`` overrides the
+        length derived from the ratio. Returns the joined partial summaries,
+        the prompt for the final merge (None when no merge is needed) and the stats
+        collected so far.
+        """
+        input_tokens = estimate_tokens(text)
+        ratio = COMPRESSION_RATIOS.get(compression_ratio)
+        if target_tokens is None and ratio:
+            target_tokens = min(int(input_tokens * ratio), self.max_output_tokens)
+        stats: Dict[str, Any] = {"input_tokens": input_tokens, "target_tokens": target_tokens, "stages": []}
+        
+        # Chunk on page and paragraph boundaries
+        started = time.perf_counter()
+        chunks = split_into_chunks(text, self.max_chunk_tokens)
+        stats["chunks"] = len(chunks)
+        self._record_stage(stats, "chunk", started, chunks=len(chunks))
+        
+        # Map: summarize every chunk in parallel at the requested ratio
+        started = time.perf_counter()
+        template = SUMMARY_PROMPTS.get(compression_ratio, DEFAULT_SUMMARY_PROMPT)
+        prompts = [
+            CHUNK_PROMPT_PREFIX.format(index=i + 1, count=len(chunks)) + template.format(text=chunk)
+            for i, chunk in enumerate(chunks)
+        ]
+        partials = self._run_parallel(self._generate_text, prompts)
+        self._record_stage(stats, "map", started, requests=len(prompts))
+        
+        # Reduce: regroup and merge until the partial summaries fit in one request
+        level = 0
+        combined = "\n\n".join(partials)
+        combined_tokens = estimate_tokens(combined)
+        while combined_tokens > self.max_chunk_tokens and level < MAX_REDUCE_LEVELS:
+            level += 1
+            started = time.perf_counter()
+            groups = split_into_chunks(combined, self.max_chunk_tokens)
+            # Shrink every level by at least half so the recursion converges
+            level_ratio = min(0.5, self.max_chunk_tokens * 0.8 / combined_tokens)
+            if target_tokens:
+                level_ratio = min(level_ratio, max(target_tokens / combined_tokens, 0.1))
+            prompts = [
+                REDUCE_PROMPT.format(words=max(50, int(estimate_tokens(group) * level_ratio * WORDS_PER_TOKEN)), text=group)
+                for group in groups
+            ]
+            partials = self._run_parallel(self._generate_text, prompts)
+            combined = "\n\n".join(partials)
+            combined_tokens = estimate_tokens(combined)
+            self._record_stage(stats, f"reduce_{level}", started, requests=len(prompts), tokens=combined_tokens)
+        stats["reduce_levels"] = level
+        
+        # Final merge into one summary at the target length
+        merge_prompt = None
+        if combined_tokens <= self.max_chunk_tokens and len(partials) > 1:
+            if target_tokens:
+                merge_prompt = REDUCE_PROMPT.format(words=int(target_tokens * WORDS_PER_TOKEN), text=combined)
             else:
-                prompt = f"Create a clear and concise summary of the following text, maintaining all important information:\n\n{text}"
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
+                merge_prompt = FINAL_MERGE_PROMPT.format(text=combined)
+        
+        return combined, merge_prompt, stats
+    
+    def _map_reduce_summary(self, text: str, compression_ratio: Optional[str],
+                            target_tokens: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """Summarize a document too large for one request: chunk -> summarize -> merge
+        
+        Returns the summary and the pipeline stats; per-stage timings are also logged.
+        """
+        combined, merge_prompt, stats = self._map_reduce_stages(text, compression_ratio, target_tokens)
+        if merge_prompt is not None:
+            started = time.perf_counter()
+            combined = self._generate_text(merge_prompt)
+            self._record_stage(stats, "merge", started, requests=1)
+        self._finish_pipeline(stats)
+        return combined, stats
+    
+    def _precompress_budget(self, text: str, compression_ratio: Optional[str],
+                            method: Optional[str]) -> Optional[int]:
+        """Token budget for local sentence selection, or None when it should be skipped
+        
+        Selection needs a ratio to size the budget and only pays off for long
+        documents where the budget is well below the input size.
+        """
+        ratio = COMPRESSION_RATIOS.get(compression_ratio)
+        if not method or not ratio:
+            return None
+        input_tokens = estimate_tokens(text)
+        budget = int(input_tokens * ratio * self.precompress_factor)
+        if input_tokens < self.precompress_min_tokens or budget >= input_tokens * 0.9:
+            return None
+        return budget
+    
+    def _prepare_source(self, text: str, compression_ratio: Optional[str], method: Optional[str],
+                        budget: Optional[int], call_stats: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+        """Return the text to send to the model and, if pre-compressed, the summary length to ask for
+        
+        The selection stats are recorded in ``call_stats["precompress"]``.
+        """
+        if budget is None:
+            return text, None
+        with metrics.span("precompress"):
+            selected, call_stats["precompress"] = compress_text(text, budget, method)
+        metrics.CHARACTERS.inc(len(text), operation="precompress", direction="input")
+        metrics.CHARACTERS.inc(len(selected), operation="precompress", direction="output")
+        target_tokens = min(int(estimate_tokens(text) * COMPRESSION_RATIOS[compression_ratio]), self.max_output_tokens)
+        return selected, target_tokens
+    
+    def _summary_templates(self, text: str, compression_ratio: Optional[str],
+                           precompress: Optional[str]) -> Tuple[str, str, Optional[str], Optional[int]]:
+        """Pick the prompt template, the template used in the cache key, the method and budget"""
+        method = self.precompress if precompress is None else precompress
+        if method and method not in PRECOMPRESS_METHODS:
+            raise ValueError(f"precompress must be one of {', '.join(PRECOMPRESS_METHODS)}")
+        budget = self._precompress_budget(text, compression_ratio, method)
+        template = SUMMARY_PROMPTS.get(compression_ratio, DEFAULT_SUMMARY_PROMPT)
+        if budget is None:
+            return template, template, None, None
+        return PRECOMPRESSED_PROMPT, f"{PRECOMPRESSED_PROMPT}\n[{method} x{self.precompress_factor}]", method, budget
+    
+    @staticmethod
+    def _format_prompt(template: str, source: str, target_tokens: Optional[int]) -> str:
+        if target_tokens is None:
+            return template.format(text=source)
+        return template.format(words=max(50, int(target_tokens * WORDS_PER_TOKEN)), text=source)
+    
+    def generate_summary(self, text: str, compression_ratio: Optional[str] = None,
+                         precompress: Optional[str] = None, stats: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a summary of the provided text with optional compression ratio
+        
+        Text larger than ``max_chunk_tokens`` is summarized with the map-reduce
+        pipeline instead of a single request. ``precompress`` ("tfidf", "textrank",
+        or "" to disable; defaults to the summarizer's setting) first selects the
+        key sentences of long documents locally. Raises a SummarizationError
+        subclass (see resilience) when no summary can be produced.
+        
+        If ``stats`` is given it is filled with details of this call: ``cached``,
+        the sentence selection stats as ``precompress`` when sentences were
+        pre-selected, and the stage timings as ``pipeline`` when the map-reduce
+        pipeline ran.
+        """
+        call_stats = {} if stats is None else stats
+        call_stats.clear()
+        with metrics.span("summary"):
+            summary = self._generate_summary(text, compression_ratio, precompress, call_stats)
+        metrics.CHARACTERS.inc(len(text or ""), operation="summary", direction="input")
+        metrics.CHARACTERS.inc(len(summary), operation="summary", direction="output")
+        return summary
+    
+    def _generate_summary(self, text: str, compression_ratio: Optional[str], precompress: Optional[str],
+                          stats: Dict[str, Any]) -> str:
+        stats["cached"] = False
+        if not text or not text.strip():
+            return "No content to summarize."
+        
+        # Build prompt based on compression ratio
+        template, cache_template, method, budget = self._summary_templates(text, compression_ratio, precompress)
+        
+        cache_key = self._cache_key(text, cache_template, compression_ratio)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            stats["cached"] = True
+            return cached
+        
+        started = time.perf_counter()
+        source, target_tokens = self._prepare_source(text, compression_ratio, method, budget, stats)
+        if estimate_tokens(source) > self.max_chunk_tokens:
+            # Cache accounting only needs the size of the input
+            prompt = source
+            summary, stats["pipeline"] = self._map_reduce_summary(source, compression_ratio, target_tokens)
+        else:
+            with metrics.span("prompt_build"):
+                prompt = self._format_prompt(template, source, target_tokens)
+            summary = self._generate_text(prompt)
+        
+        with metrics.span("postprocess"):
+            # Remove any asterisks or unwanted formatting
+            summary = summary.strip().replace('*', '').replace('#', '')
+        self._cache_store(cache_key, summary, prompt, started)
+        return summary
+    
+    def _stream_cleaned(self, prompt: str, pieces: List[str]) -> Iterator[str]:
+        """Stream a prompt's reply with formatting characters removed, collecting it in ``pieces``"""
+        for chunk in self._generate_stream(prompt):
+            piece = (chunk.text or "").replace('*', '').replace('#', '')
+            if not pieces:
+                # Mirror the strip() of the non-streaming path at the start
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+            pieces.append(piece)
+            yield piece
+    
+    def stream_summary(self, text: str, compression_ratio: Optional[str] = None,
+                       precompress: Optional[str] = None, stats: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Yield a summary incrementally as the model streams it
+        
+        The same cleanup as generate_summary is applied to every piece, so the
+        concatenated output matches the non-streaming summary. Cached summaries are
+        yielded in one piece; for map-reduce inputs only the final merge streams.
+        Failures raise SummarizationError, possibly after some pieces were yielded.
+        ``stats`` is filled as in generate_summary while the summary streams.
+        """
+        call_stats = {} if stats is None else stats
+        call_stats.clear()
+        call_stats["cached"] = False
+        if not text or not text.strip():
+            yield "No content to summarize."
+            return
+        
+        template, cache_template, method, budget = self._summary_templates(text, compression_ratio, precompress)
+        
+        cache_key = self._cache_key(text, cache_template, compression_ratio)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            call_stats["cached"] = True
+            yield cached
+            return
+        
+        started = time.perf_counter()
+        source, target_tokens = self._prepare_source(text, compression_ratio, method, budget, call_stats)
+        pipeline = None
+        if estimate_tokens(source) > self.max_chunk_tokens:
+            combined, prompt, pipeline = self._map_reduce_stages(source, compression_ratio, target_tokens)
+            call_stats["pipeline"] = pipeline
+            if prompt is None:
+                self._finish_pipeline(pipeline)
+                summary = combined.strip().replace('*', '').replace('#', '')
+                self._cache_store(cache_key, summary, source, started)
+                yield summary
+                return
+        else:
+            prompt = self._format_prompt(template, source, target_tokens)
+        
+        merge_started = time.perf_counter()
+        pieces: List[str] = []
+        yield from self._stream_cleaned(prompt, pieces)
+        
+        if pipeline is not None:
+            self._record_stage(pipeline, "merge", merge_started, requests=1)
+            self._finish_pipeline(pipeline)
+        
+        summary = "".join(pieces).strip()
+        if summary:
+            self._cache_store(cache_key, summary, source if pipeline is not None else prompt, started)
+        else:
+            raise EmptyResponseError("Model returned an empty response")
+    
+    def stream_summary_update(self, previous_summary: str, appended_text: str) -> Iterator[str]:
+        """Yield an updated summary covering ``previous_summary`` plus newly appended text
+        
+        Used for live summarization: only the appended text and the previous summary
+        are sent, rather than the whole document again.
+        """
+        if not appended_text or not appended_text.strip():
+            yield previous_summary
+            return
+        
+        cache_key = self._cache_key(f"{previous_summary}\n\n{appended_text}", UPDATE_SUMMARY_PROMPT, None)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        prompt = UPDATE_SUMMARY_PROMPT.format(summary=previous_summary, text=appended_text)
+        started = time.perf_counter()
+        pieces: List[str] = []
+        yield from self._stream_cleaned(prompt, pieces)
+        
+        summary = "".join(pieces).strip()
+        if summary:
+            self._cache_store(cache_key, summary, prompt, started)
+        else:
+            raise EmptyResponseError("Model returned an empty response")
+    
+    def _summarize_thread(self, thread_id: Any, combined_text: str) -> Dict[str, Any]:
+        """Summarize a single email thread; failures are reported per thread
+        
+        A failed thread has no ``body``; its ``error`` and ``error_type`` describe
+        the SummarizationError instead, so one thread cannot sink the mailbox.
+        """
+        metrics.CHARACTERS.inc(len(combined_text), operation="thread", direction="input")
+        with metrics.span("thread"):
+            try:
+                cache_key = self._cache_key(combined_text, THREAD_SUMMARY_PROMPT, None)
+                cached = self._cache_lookup(cache_key)
+                if cached is not None:
+                    return {
+                        "thread_id": thread_id,
+                        "body": cached
+                    }
+                
+                # Create a specific prompt for email thread summarization
+                prompt = THREAD_SUMMARY_PROMPT.format(text=combined_text)
+                started = time.perf_counter()
+                
+                summary = self._generate_text(prompt)
+                # Clean up formatting
+                summary = summary.replace('*', '').replace('#', '').replace('\n', ' ')
+                self._cache_store(cache_key, summary, prompt, started)
+                return {
+                    "thread_id": thread_id,
+                    "body": summary
+                }
+                
+            except SummarizationError as e:
+                logging.error(f"Error summarizing thread {thread_id}: {e}")
+                return {
+                    "thread_id": thread_id,
+                    "error": str(e),
+                    "error_type": type(e).__name__
+                }
+    
+    def _summarize_packed(self, batch: List[Tuple[Any, str]]) -> List[Dict[str, Any]]:
+        """Summarize several short threads with one request asking for JSON keyed by thread_id
+        
+        Cached threads are not resent. Any thread missing from the reply (or the
+        whole batch, if the reply is not valid JSON) falls back to its own request.
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+        misses: List[Tuple[int, Any, str, Optional[str]]] = []
+        for index, (thread_id, combined_text) in enumerate(batch):
+            cache_key = self._cache_key(combined_text, THREAD_SUMMARY_PROMPT, None)
+            cached = self._cache_lookup(cache_key)
+            if cached is not None:
+                results[index] = {"thread_id": thread_id, "body": cached}
+            else:
+                misses.append((index, thread_id, combined_text, cache_key))
+        
+        if len(misses) > 1:
+            keys = [str(thread_id) for _, thread_id, _, _ in misses]
+            threads_text = "\n\n".join(
+                f"<thread id={json.dumps(key)}>\n{combined_text}\n</thread>"
+                for key, (_, _, combined_text, _) in zip(keys, misses)
+            )
+            prompt = PACKED_THREADS_PROMPT.format(text=threads_text)
+            config = types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={key: types.Schema(type=types.Type.STRING) for key in keys},
+                    required=keys
+                )
             )
+            started = time.perf_counter()
             
-            if response and response.text:
-                # Clean up the response text
-                summary = response.text.strip()
-                # Remove any asterisks or unwanted formatting
-                summary = summary.replace('*', '').replace('#', '')
-                return summary
-            else:
-                return "Failed to generate summary. Please try again."
-                
-        except Exception as e:
-            logging.error(f"Error generating summary: {e}")
-            return f"Error generating summary: {str(e)}"
+            try:
+                response = self._generate(prompt, config)
+                reply = json.loads(response.text) if response and response.text else {}
+                if not isinstance(reply, dict):
+                    raise ValueError("Packed reply is not a JSON object")
+            except Exception as e:
+                logging.error(f"Packed summary request for {len(misses)} threads failed: {e}")
+                reply = {}
+            
+            remaining = []
+            for key, (index, thread_id, combined_text, cache_key) in zip(keys, misses):
+                summary = reply.get(key)
+                if isinstance(summary, str) and summary.strip():
+                    summary = summary.strip().replace('*', '').replace('#', '').replace('\n', ' ')
+                    self._cache_store(cache_key, summary, combined_text, started)
+                    results[index] = {"thread_id": thread_id, "body": summary}
+                else:
+                    remaining.append((index, thread_id, combined_text, cache_key))
+            metrics.PACKED_THREADS.inc(len(misses) - len(remaining), outcome="packed")
+            metrics.PACKED_THREADS.inc(len(remaining), outcome="fallback")
+            misses = remaining
+        
+        for index, thread_id, combined_text, _ in misses:
+            results[index] = self._summarize_thread(thread_id, combined_text)
+        
+        return [results[index] for index in range(len(batch))]
     
-    def summarize_json_threads(self, json_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Summarize JSON data containing email threads"""
-        try:
-            summaries = []
+    def iter_thread_summaries(self, thread_groups: Iterable[Tuple[Any, List[str]]],
+                              max_workers: Optional[int] = None,
+                              pack: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+        """Summarize ``(thread_id, bodies)`` groups as they arrive, yielding results in order
+        
+        At most a few requests per worker are in flight at once, so a lazily produced
+        stream of groups (see json_stream.group_threads) is summarized in bounded
+        memory and each summary is emitted as soon as it and its predecessors finish.
+        
+        With packing (``pack``, defaulting to ``pack_threads``) consecutive short
+        threads are packed next-fit into shared requests of up to
+        ``pack_token_budget`` tokens; longer threads still get their own request.
+        
+        With ``clean_threads`` quoted replies, signatures and near-duplicate
+        messages are removed first (see email_cleanup.clean_thread) and each
+        result reports the estimated ``tokens_saved``.
+        """
+        pack = self.pack_threads if pack is None else pack
+        workers = max(1, max_workers or self.max_concurrency)
+        
+        def finished(entry: Tuple[Future, List[int]]) -> Iterator[Dict[str, Any]]:
+            future, saved = entry
+            for result, tokens_saved in zip(future.result(), saved):
+                result["tokens_saved"] = tokens_saved
+                yield result
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reease-thread") as executor:
+            pending: Deque[Tuple[Future, List[int]]] = deque()
+            batch: List[Tuple[Any, str]] = []
+            batch_saved: List[int] = []
+            batch_keys = set()
+            batch_tokens = 0
             
-            # Group messages by thread_id
-            thread_groups = {}
-            for item in json_data:
-                thread_id = item.get("thread_id")
-                body = item.get("body", "")
-                
-                if thread_id is not None:
-                    if thread_id not in thread_groups:
-                        thread_groups[thread_id] = []
-                    thread_groups[thread_id].append(body)
+            def submit_batch() -> None:
+                nonlocal batch, batch_saved, batch_keys, batch_tokens
+                if batch:
+                    pending.append((executor.submit(self._summarize_thread_batch, batch), batch_saved))
+                batch, batch_saved, batch_keys, batch_tokens = [], [], set(), 0
             
-            # Generate summaries for each thread
-            for thread_id, bodies in thread_groups.items():
+            for thread_id, bodies in thread_groups:
+                tokens_saved = 0
+                if self.clean_threads:
+                    bodies, cleanup = clean_thread(bodies)
+                    tokens_saved = cleanup["tokens_saved"]
+                    metrics.THREAD_TOKENS_SAVED.inc(tokens_saved)
                 combined_text = " ".join(bodies).strip()
+                if not combined_text:
+                    continue
                 
-                if combined_text:
-                    # Create a specific prompt for email thread summarization
-                    prompt = f"Summarize this email thread in 60 words or less. Focus on key decisions, actions, and important details. Remove formatting characters and line breaks:\n\n{combined_text}"
-                    
-                    response = self.client.models.generate_content(
-                        model=self.model,
-                        contents=prompt
-                    )
-                    
-                    if response and response.text:
-                        summary = response.text.strip()
-                        # Clean up formatting
-                        summary = summary.replace('*', '').replace('#', '').replace('\n', ' ')
-                        summaries.append({
-                            "thread_id": thread_id,
-                            "body": summary
-                        })
-                    else:
-                        summaries.append({
-                            "thread_id": thread_id,
-                            "body": "Failed to generate summary for this thread."
-                        })
-            
-            return summaries
+                tokens = estimate_tokens(combined_text) + PACKED_THREAD_OVERHEAD_TOKENS
+                key = str(thread_id)
+                if batch and (
+                    not pack
+                    or tokens > self.pack_max_thread_tokens
+                    or batch_tokens + tokens > self.pack_token_budget
+                    or len(batch) >= self.pack_max_threads
+                    or key in batch_keys
+                ):
+                    submit_batch()
+                
+                batch.append((thread_id, combined_text))
+                batch_saved.append(tokens_saved)
+                batch_keys.add(key)
+                batch_tokens += tokens
+                if not pack or tokens > self.pack_max_thread_tokens:
+                    submit_batch()
+                
+                while pending and (pending[0][0].done() or len(pending) >= workers * 2):
+                    yield from finished(pending.popleft())
             
+            submit_batch()
+            while pending:
+                yield from finished(pending.popleft())
+    
+    def _summarize_thread_batch(self, batch: List[Tuple[Any, str]]) -> List[Dict[str, Any]]:
+        """Unit of work for the thread pool: one thread alone or a packed batch"""
+        if len(batch) == 1:
+            return [self._summarize_thread(*batch[0])]
+        return self._summarize_packed(batch)
+    
+    def summarize_json_threads(self, json_data: Iterable[Dict[str, Any]],
+                               max_workers: Optional[int] = None,
+                               pack: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Summarize JSON data containing email threads
+        
+        Threads are summarized concurrently by a bounded worker pool (``max_workers``,
+        defaulting to ``max_concurrency``), optionally packing short threads into
+        shared requests. Results keep the order in which each thread_id first
+        appears in the input.
+        """
+        try:
+            return list(self.iter_thread_summaries(group_threads(json_data), max_workers, pack))
         except Exception as e:
             logging.error(f"Error summarizing JSON threads: {e}")
             return [{"error": f"Failed to process JSON data: {str(e)}"}]
@@ -0,0 +1,31 @@
+from email_cleanup import clean_thread
+
+PROPOSAL = "We propose a 3-year contract at $120k/year with quarterly reviews and a dedicated support engineer."
+FORWARD = (
+    "FYI, see the vendor's proposal below.\n\n"
+    "---------- Forwarded message ---------\n"
+    "From: Vendor <sales@vendor.example>\n"
+    "Date: Mon, 1 Jan 2024\n"
+    "Subject: Proposal\n\n"
+    + PROPOSAL
+)
+
+
+def test_forwarded_message_is_kept():
+    cleaned, stats = clean_thread([FORWARD, "Thanks"])
+    assert PROPOSAL in cleaned[0]
+    assert cleaned[0].startswith("FYI, see the vendor's proposal below.")
+    assert cleaned[1] == "Thanks"
+    assert stats["duplicates_removed"] == 0
+
+
+def test_forwarded_message_already_in_the_thread_is_dropped():
+    cleaned, stats = clean_thread([PROPOSAL, FORWARD])
+    assert cleaned == [PROPOSAL, "FYI, see the vendor's proposal below."]
+    assert stats["duplicates_removed"] == 1
+
+
+def test_quoted_reply_is_stripped():
+    reply = "Sounds good.\n\nOn Mon, Jan 1, 2024 at 9:00 AM Bob <bob@example.com> wrote:\n> " + PROPOSAL
+    cleaned, _ = clean_thread([PROPOSAL, reply])
+    assert cleaned == [PROPOSAL, "Sounds good."]
@@ -0,0 +1,25 @@
+import io
+
+from ooxml import iter_part_text
+
+DRAWINGML = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+
+
+def _cell(text: str) -> str:
+    run = f"<a:r><a:t>{text}</a:t></a:r>" if text else ""
+    return f"<a:tc><a:txBody><a:p>{run}</a:p></a:txBody></a:tc>"
+
+
+def _table(rows) -> bytes:
+    body = "".join("<a:tr>" + "".join(map(_cell, row)) + "</a:tr>" for row in rows)
+    return f"<a:graphicData {DRAWINGML}><a:tbl>{body}</a:tbl></a:graphicData>".encode()
+
+
+def test_empty_cells_keep_their_column():
+    blocks = list(iter_part_text(io.BytesIO(_table([["c00", ""], ["", "c11"]]))))
+    assert blocks == ["c00 | \n | c11"]
+
+
+def test_rows_without_text_are_dropped():
+    blocks = list(iter_part_text(io.BytesIO(_table([["a", "b"], ["", ""], ["c", "d"]]))))
+    assert blocks == ["a | b\nc | d"]
@@ -0,0 +1,60 @@
+import time
+
+import httpx
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceededError, ModelUnavailableError, ResilientCaller
+
+
+def _fail(remaining):
+    raise httpx.ConnectTimeout("timed out")
+
+
+def _open_breaker(caller: ResilientCaller) -> None:
+    with pytest.raises(ModelUnavailableError):
+        caller.call(_fail, deadline=1.0)
+    assert caller.breaker.state != "closed"
+
+
+def _caller(**kwargs) -> ResilientCaller:
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    return ResilientCaller(max_retries=0, base_delay=0.0, breaker=breaker, seed=0, **kwargs)
+
+
+def test_hedged_half_open_trial_that_hits_the_deadline_reopens_the_circuit():
+    caller = _caller(hedge=True)
+    _open_breaker(caller)
+    time.sleep(0.06)
+    
+    with pytest.raises(DeadlineExceededError):
+        caller.call(lambda remaining: time.sleep(0.2) or "late", deadline=0.05)
+    assert caller.breaker.state == "open"
+    assert not caller.breaker._trial_in_flight
+    
+    time.sleep(0.06)
+    assert caller.call(lambda remaining: "ok", deadline=1.0) == "ok"
+    assert caller.breaker.state == "closed"
+
+
+def test_half_open_trial_rejected_before_sending_does_not_wedge_the_breaker():
+    caller = _caller()
+    _open_breaker(caller)
+    time.sleep(0.06)
+    
+    with pytest.raises(DeadlineExceededError):
+        caller.call(lambda remaining: "never sent", deadline=-1)
+    with pytest.raises(CircuitOpenError):
+        caller.call(lambda remaining: "ok", deadline=1.0)
+    
+    time.sleep(0.06)
+    assert caller.call(lambda remaining: "ok", deadline=1.0) == "ok"
+
+
+def test_only_one_half_open_trial_at_a_time():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.release_trial()
+    assert breaker.before_call() is True
@@ -0,0 +1,11 @@
+# Rough token accounting shared by the rate limiter and prompt budgeting.
+# Gemini tokenizes English prose at roughly four characters per token; we
+# only need an estimate that is cheap and errs on the high side.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in a piece of text"""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
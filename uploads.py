@@ -0,0 +1,167 @@
+"""Summarize many uploaded files at once.
+
+``summarize_files`` extracts the files in parallel on a pool of worker
+processes (parsing PDFs and Office documents is CPU-bound Python, so threads
+would share one core) and hands each extracted text to a bounded thread pool
+for summarization as soon as it is ready. It yields one event per file and
+stage as results complete, so callers can show per-file progress.
+
+``SummaryArchive`` writes the summaries into a ZIP file on disk one entry at a
+time as they arrive, so the archive is never assembled in memory.
+
+For summarizing directories from the command line, see batch.py.
+"""
+import io
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool, ProcessPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+from extractors import extract_text, file_process_pool
+
+MAX_EXTRACT_WORKERS = int(os.environ.get("REEASE_EXTRACT_WORKERS", os.cpu_count() or 1))
+
+_pool_lock = threading.Lock()
+_extract_pool: Optional[ProcessPoolExecutor] = None
+
+
+def extract_file(filename: str, data: bytes) -> Tuple[str, float]:
+    """Extract one file's text and report the seconds it took (runs in a worker process)"""
+    started = time.perf_counter()
+    text = extract_text(io.BytesIO(data), filename)
+    return text, time.perf_counter() - started
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    """Process-wide extraction pool, started on first use and kept warm between batches"""
+    global _extract_pool
+    with _pool_lock:
+        if _extract_pool is None:
+            _extract_pool = file_process_pool(MAX_EXTRACT_WORKERS)
+        return _extract_pool
+
+
+def _reset_process_pool() -> None:
+    """Drop a pool whose worker died so the next batch starts a fresh one"""
+    global _extract_pool
+    with _pool_lock:
+        pool, _extract_pool = _extract_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_files(summarizer, files: Sequence[Tuple[str, bytes]], compression_ratio: Optional[str] = None,
+                    precompress: Optional[str] = None,
+                    max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Extract and summarize ``(filename, data)`` pairs, yielding events as work completes
+    
+    Every file produces an ``"extracted"`` event (with ``characters`` and
+    ``seconds``) followed by a ``"summarized"`` event (with ``summary``), or a
+    single ``"failed"`` event with the ``error`` and the ``failed_stage``. Each
+    event carries the file's ``index`` and ``filename``. At most
+    ``max_workers`` (default: the summarizer's ``max_concurrency``) summaries
+    run at once. A single file is extracted in-process, since starting a
+    worker would cost more than it saves.
+    """
+    if not files:
+        return
+    workers = max(1, max_workers or summarizer.max_concurrency)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reease-file") as summary_pool:
+        extract_pool: Executor = _process_pool() if len(files) > 1 else summary_pool
+        pending: Dict[Future, Tuple[int, str]] = {}
+        for index, (filename, data) in enumerate(files):
+            pending[extract_pool.submit(extract_file, filename, data)] = (index, "extract")
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, stage = pending.pop(future)
+                filename = files[index][0]
+                event: Dict[str, Any] = {"index": index, "filename": filename}
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    _reset_process_pool()
+                    yield {**event, "stage": "failed", "failed_stage": stage,
+                           "error": f"Extraction worker stopped unexpectedly: {e}"}
+                    continue
+                except Exception as e:
+                    logging.error(f"Failed to {stage} {filename}: {e}")
+                    yield {**event, "stage": "failed", "failed_stage": stage, "error": str(e)}
+                    continue
+                
+                if stage == "extract":
+                    text, seconds = result
+                    if not text:
+                        yield {**event, "stage": "failed", "failed_stage": stage,
+                               "error": "No text could be extracted from the file"}
+                        continue
+                    summary_future = summary_pool.submit(summarizer.generate_summary, text,
+                                                         compression_ratio, precompress)
+                    pending[summary_future] = (index, "summarize")
+                    yield {**event, "stage": "extracted", "characters": len(text), "seconds": round(seconds, 3)}
+                else:
+                    yield {**event, "stage": "summarized", "summary": result}
+
+
+class SummaryArchive:
+    """A ZIP of summaries written entry by entry to a temporary file on disk
+    
+    The file is removed on ``close`` (or when the ``with`` block exits).
+    """
+    
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._file = tempfile.NamedTemporaryFile(prefix="reease-summaries-", suffix=".zip", delete=False)
+        self.path = self._file.name
+        self._zip = zipfile.ZipFile(self._file, "w", compression=compression)
+        self._reader: Optional[BinaryIO] = None
+        self._names: Set[str] = set()
+        self.entries = 0
+    
+    def _unique_name(self, name: str) -> str:
+        stem, ext = posixpath.splitext(name)
+        candidate, counter = name, 2
+        while candidate in self._names:
+            candidate, counter = f"{stem}-{counter}{ext}", counter + 1
+        self._names.add(candidate)
+        return candidate
+    
+    def add(self, name: str, content: bytes) -> str:
+        """Write ``content`` as a new entry and return the entry name used"""
+        # Uploaded names may carry client paths; keep only the base name
+        name = self._unique_name(posixpath.basename(name.replace("\\", "/")) or "summary")
+        with self._zip.open(name, "w") as entry:
+            entry.write(content)
+        self.entries += 1
+        return name
+    
+    def finish(self) -> BinaryIO:
+        """Write the central directory and return the archive opened for reading"""
+        self._zip.close()
+        self._file.close()
+        # A plain read-only file object: Streamlit's download_button rejects read/write ones
+        self._reader = open(self.path, "rb")
+        return self._reader
+    
+    def close(self) -> None:
+        self._zip.close()
+        self._file.close()
+        if self._reader is not None:
+            self._reader.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+    
+    def __enter__(self) -> "SummaryArchive":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()